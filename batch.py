@@ -0,0 +1,78 @@
+"""
+Optional NumPy backend that scores and evaluates many boards at once, for self-play data and move analysis.
+Boards are stacked into a (batch, width, height) array indexed like HiddenBoard.cells (column, then row from
+the bottom), and every four-cell window is counted with sliding-window sums in all four directions.
+"""
+
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError('batch.py needs NumPy, install it with: pip install numpy') from error
+
+from engine import THREAT_WEIGHTS
+
+
+def stack(boards):
+    # Boards must all be the same size
+    width, height = boards[0].width, boards[0].height
+    return np.array([board.cells for board in boards], dtype=np.int8).reshape(len(boards), width, height)
+
+
+def window_sums(stones):
+    # Sums of every horizontal, vertical, positive diagonal and negative diagonal window of four
+    cols, rows = max(stones.shape[-2] - 3, 0), max(stones.shape[-1] - 3, 0)
+    return (
+        sum(stones[..., i:i + cols, :] for i in range(4)),
+        sum(stones[..., :, i:i + rows] for i in range(4)),
+        sum(stones[..., i:i + cols, i:i + rows] for i in range(4)),
+        sum(stones[..., i:i + cols, 3 - i:3 - i + rows] for i in range(4))
+    )
+
+
+def players_to_move(cells):
+    # Player 1 moves when there is an even number of counters on the board
+    return 1 + (np.count_nonzero(cells, axis=(-2, -1)) % 2)
+
+
+def connection_counts(cells):
+    # Four in a rows of each player, shape (batch, 2)
+    return np.stack([sum(np.count_nonzero(sums == 4, axis=(-2, -1)) for sums in window_sums((cells == player).astype(np.int8)))
+                     for player in (1, 2)], axis=-1)
+
+
+def threat_counts(cells):
+    # Windows with 0 to 4 of a player's counters and none of the opponent's, shape (batch, 2, 5)
+    ones, twos = window_sums((cells == 1).astype(np.int8)), window_sums((cells == 2).astype(np.int8))
+    counts = np.zeros(cells.shape[:-2] + (2, 5), dtype=np.int64)
+    for count in range(5):
+        counts[..., 0, count] = sum(np.count_nonzero((mine == count) & (theirs == 0), axis=(-2, -1)) for mine, theirs in zip(ones, twos))
+        counts[..., 1, count] = sum(np.count_nonzero((mine == count) & (theirs == 0), axis=(-2, -1)) for mine, theirs in zip(twos, ones))
+    return counts
+
+
+def evaluate(cells):
+    # Same as HiddenBoard.evaluation for every board, shape (batch,)
+    threats = threat_counts(cells)
+    return (threats[..., 0, :] - threats[..., 1, :]) @ np.array(THREAT_WEIGHTS)
+
+
+def score_moves(cells):
+    # Points each column would earn the player to move, like make_move(col, True), or -1 if the
+    # column is full. Shape (batch, width)
+    batch, width, height = cells.shape
+    players = players_to_move(cells)
+    entries = np.count_nonzero(cells, axis=-1)
+    legal = entries < height
+
+    # One copy of each board per column, with the player's counter dropped into that column
+    moves = np.repeat(cells[:, None], width, axis=1)
+    b, col = np.nonzero(legal)
+    moves[b, col, col, entries[b, col]] = players[b]
+
+    mine = (moves == players[:, None, None, None]).astype(np.int8)
+    before = (cells == players[:, None, None]).astype(np.int8)
+    after_count = sum(np.count_nonzero(sums == 4, axis=(-2, -1)) for sums in window_sums(mine))
+    before_count = sum(np.count_nonzero(sums == 4, axis=(-2, -1)) for sums in window_sums(before))
+
+    return np.where(legal, after_count - before_count[:, None], -1).reshape(batch, width)
@@ -0,0 +1,116 @@
+"""
+Times how the engine and the canvas cope as boards get bigger: building the window tables, checking a
+move, the bots' move latency and, with --render (which needs a display), drawing, zooming, restarting
+and dropping a counter on the canvas, along with how many Tk calls each zoom step makes.
+
+Usage (from the repository root): python -m benchmarks.boards --sizes 7x6,10x10,20x20,50x50
+                                  python -m benchmarks.boards --render
+"""
+
+
+import argparse, random, time
+
+from engine import BitBoard, WindowIndex, AI, AlphaBetaAI, parse_size
+
+
+def midgame(width, height, seed):
+    # Board a third full from fixed-seed random moves
+    rng = random.Random(f'{seed}-{width}x{height}')
+    board = BitBoard(width, height)
+    for _ in range(width * height // 3):
+        board.make_move(rng.choice(board.get_valid_moves()))
+    return board
+
+
+def timed(function, repeat=1):
+    # Best time of a few runs, in milliseconds
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def engine_benchmarks(width, height, time_limit, seed):
+    board = midgame(width, height, seed)
+    moves = board.get_valid_moves()
+    alphabeta = AlphaBetaAI(board, time_limit, book=False, solve_below=0)
+
+    return {
+        'index_ms': timed(lambda: WindowIndex(width, height), 3),
+        'check_ms': timed(lambda: [board.make_move(col, True) for col in moves], 5) / max(len(moves), 1),
+        'greedy_ms': timed(lambda: AI(board, book=False, solve_below=0).get_move(), 5),
+        'alphabeta_ms': timed(alphabeta.get_move),
+        'alphabeta_depth': alphabeta.depth_reached
+    }
+
+
+def render_benchmarks(sizes, seed):
+    # Only imported here so the engine benchmarks run without a display
+    from main import FourInARow
+
+    class RenderBenchmark(FourInARow):
+        def create_menubar(self):
+            # Called just before the main loop starts, so the benchmarks run inside it instead of a game
+            self.window.after(0, self.run)
+
+
+        def run(self):
+            self.set_players(2)
+            for width, height in sizes:
+                def draw():
+                    self.set_size(width, height)
+                    self.window.update()
+
+                zoom_calls = []
+
+                def zoom():
+                    for factor in (0.1, -0.1):
+                        self.preferences.zoom(factor)
+                        zoom_calls.append(self.canvas.redraw_calls)
+                    self.window.update()
+
+                def drop():
+                    # The first frame of the animation, which is all that happens before control returns to Tk
+                    self.board.make_move(random.Random(seed).choice(self.board.get_valid_moves()))
+                    self.window.update()
+
+                self.results[width, height] = {'draw_ms': timed(draw), 'restart_ms': timed(draw, 3),
+                                               'zoom_ms': timed(zoom, 3) / 2, 'drop_ms': timed(drop, 5),
+                                               'zoom_calls': max(zoom_calls), 'items': len(self.canvas.canvas.find_all())}
+            self.window.destroy()
+
+    RenderBenchmark.results = {}
+    RenderBenchmark()
+    return RenderBenchmark.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the engine and canvas on bigger and bigger boards.')
+    parser.add_argument('--sizes', default='7x6,10x10,20x20,30x30,40x40,50x50', help='comma separated board sizes, like 7x6 or 20')
+    parser.add_argument('--time', type=int, default=200, help='milliseconds the alpha-beta bot gets for its move')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random positions')
+    parser.add_argument('--render', action='store_true', help='also time the canvas (needs a display)')
+    args = parser.parse_args()
+
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',')]
+    except ValueError as error:
+        parser.error(str(error))
+
+    print(f"{'size':>7} {'index ms':>9} {'check ms':>9} {'greedy ms':>10} {'ab ms':>8} {'ab depth':>9}")
+    for width, height in sizes:
+        result = engine_benchmarks(width, height, args.time, args.seed)
+        print(f"{f'{width}x{height}':>7} {result['index_ms']:>9.2f} {result['check_ms']:>9.3f} {result['greedy_ms']:>10.2f} "
+              f"{result['alphabeta_ms']:>8.1f} {result['alphabeta_depth']:>9}")
+
+    if args.render:
+        print(f"\n{'size':>7} {'items':>6} {'draw ms':>8} {'restart ms':>11} {'zoom ms':>8} {'zoom calls':>11} {'drop ms':>8}")
+        for (width, height), result in render_benchmarks(sizes, args.seed).items():
+            print(f"{f'{width}x{height}':>7} {result['items']:>6} {result['draw_ms']:>8.1f} {result['restart_ms']:>11.1f} "
+                  f"{result['zoom_ms']:>8.1f} {result['zoom_calls']:>11} {result['drop_ms']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
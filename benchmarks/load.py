@@ -0,0 +1,98 @@
+"""
+Load tests server.py by playing hundreds of games against it at once, each on its own connection, with
+random human moves. Reports request latencies, move throughput and the server's own stats at the end.
+
+Usage (from the repository root, with the server running): python -m benchmarks.load --sessions 300 --ai greedy
+"""
+
+
+import argparse, asyncio, json, random, time
+
+from tournament import percentile
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+
+    @classmethod
+    async def connect(cls, args):
+        if args.unix:
+            return cls(*await asyncio.open_unix_connection(args.unix))
+        return cls(*await asyncio.open_connection(args.host, args.port))
+
+
+    async def request(self, latencies, **request):
+        start = time.perf_counter()
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        response = json.loads(await self.reader.readline())
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response
+
+
+    def close(self):
+        self.writer.close()
+
+
+async def play(number, args, latencies, totals):
+    # One whole game: humans play random columns and the bot answers on the server
+    rng = random.Random(f'{args.seed}-{number}')
+    client = await Client.connect(args)
+    try:
+        state = await client.request(latencies, op='new', width=args.width, height=args.height, players=args.players, ai=args.ai)
+        while not state['gameover']:
+            if args.players == 0:
+                state = await client.request(latencies, op='move', game=state['game'])
+            else:
+                state = await client.request(latencies, op='move', game=state['game'], col=rng.choice(state['valid']))
+            totals['moves'] += len(state['played'])
+        await client.request(latencies, op='close', game=state['game'])
+        totals['games'] += 1
+    except (RuntimeError, ConnectionError) as error:
+        totals['errors'] += 1
+        print(f'Session {number}: {error}')
+    finally:
+        client.close()
+
+
+async def run(args):
+    latencies = []
+    totals = {'games': 0, 'moves': 0, 'errors': 0}
+
+    start = time.perf_counter()
+    await asyncio.gather(*(play(number, args, latencies, totals) for number in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    client = await Client.connect(args)
+    server_stats = await client.request([], op='stats')
+    client.close()
+
+    print(f"{args.sessions} sessions: {totals['games']} games, {totals['errors']} errors, {totals['moves']} moves in {elapsed:.2f}s")
+    print(f"{len(latencies) / elapsed:.1f} requests/s, {totals['moves'] / elapsed:.1f} moves/s")
+    print(f'request latency p50 {percentile(latencies, 50):.1f}ms  p95 {percentile(latencies, 95):.1f}ms  max {max(latencies, default=0):.1f}ms')
+    print(f"server: {server_stats['games']} games open, {server_stats['timeouts']} bot timeouts, "
+          f"bot move p50 {server_stats['bot_p50_ms']:.1f}ms  p95 {server_stats['bot_p95_ms']:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Four In A Row game server.')
+    parser.add_argument('--host', default='127.0.0.1', help='server address')
+    parser.add_argument('--port', type=int, default=4444, help='server TCP port')
+    parser.add_argument('--unix', help='connect to this Unix socket path instead of TCP')
+    parser.add_argument('--sessions', type=int, default=200, help='number of games to play at once')
+    parser.add_argument('--width', type=int, default=7, help='board width')
+    parser.add_argument('--height', type=int, default=6, help='board height')
+    parser.add_argument('--players', type=int, default=1, choices=(0, 1, 2), help='humans per game')
+    parser.add_argument('--ai', default='greedy', help="bot spec, e.g. greedy or 'alphabeta:time_limit=50'")
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random human moves')
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Microbenchmarks of the engine's hot paths: make_move (checking and committing), get_valid_moves and is_gameover
+on both HiddenBoard (what the searches run on) and BitBoard, and AI.get_move, on every board size and at several
+fill levels. Positions come from fixed-seed random games, every measurement is warmed up and repeated, and the
+best time per call is kept as the least noisy.
+Results are saved and compared the same way as tournament.py's, by best time per call.
+
+Usage (from the repository root): python -m benchmarks.micro --output baseline.json
+                                  python -m benchmarks.micro --compare baseline.json --tolerance 20
+"""
+
+
+import argparse, random, statistics, time
+
+from engine import HiddenBoard, BitBoard, AI, parse_sizes
+from tournament import add_baseline_arguments, save_and_compare
+
+
+def random_position(board_type, size, fill, rng):
+    # Board with fill percent of its cells played at random, always leaving a move to make
+    board = board_type(size)
+    for _ in range(min(size * size * fill // 100, size * size - 1)):
+        board.make_move(rng.choice(board.get_valid_moves()))
+    return board
+
+
+def make_check(board, ai):
+    for col in board.get_valid_moves():
+        board.make_move(col, True)
+
+
+def make_commit(board, ai):
+    # The commit path can only be repeated by taking the move back again
+    board.make_move(board.get_valid_moves()[0])
+    board.unmake_move()
+
+
+def valid_moves(board, ai):
+    board.get_valid_moves()
+
+
+def gameover(board, ai):
+    board.is_gameover()
+
+
+def get_move(board, ai):
+    ai.get_move()
+
+
+BENCHMARKS = {
+    'make_move_check': make_check, 'make_move_commit': make_commit, 'get_valid_moves': valid_moves,
+    'is_gameover': gameover, 'get_move': get_move
+}
+
+# Board types each benchmark runs on. The AI searches a HiddenBoard copy whatever it's given, so get_move only needs one
+BOARDS = {'HiddenBoard': HiddenBoard, 'BitBoard': BitBoard}
+BOARD_BENCHMARKS = {'make_move_check', 'make_move_commit', 'get_valid_moves', 'is_gameover'}
+
+
+def measure(function, board, ai, repeat, warmup, min_time):
+    # Pick a number of calls that takes at least min_time seconds, then time that many calls repeat times
+    calls = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            function(board, ai)
+        if time.perf_counter_ns() - start >= min_time * 1e9:
+            break
+        calls *= 2
+
+    times = []
+    for i in range(warmup + repeat):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            function(board, ai)
+        if i >= warmup:
+            times.append((time.perf_counter_ns() - start) / calls)
+
+    return calls, min(times), statistics.median(times)
+
+
+def run(names, sizes, fills, repeat, warmup, min_time, seed):
+    results = []
+    for size in sizes:
+        for fill in fills:
+            for board_name, board_type in BOARDS.items():
+                # The same position on each type of board
+                board = random_position(board_type, size, fill, random.Random(f'{seed}-{size}-{fill}'))
+
+                # The search itself is what's being timed, so no book or solved table lookups
+                ai = AI(board, book=False, solve_below=0)
+                for name in names:
+                    if name not in BOARD_BENCHMARKS and board_name != 'BitBoard':
+                        continue
+                    calls, best, median = measure(BENCHMARKS[name], board, ai, repeat, warmup, min_time)
+                    results.append({'name': name, 'board': board_name, 'size': size, 'fill': fill, 'calls': calls,
+                                    'best_ns': best, 'median_ns': median})
+
+    return {'sizes': sizes, 'fills': fills, 'repeat': repeat, 'seed': seed, 'results': results}
+
+
+def report(results):
+    print(f"{'benchmark':>18} {'board':>11} {'size':>4} {'fill':>5} {'calls':>8} {'best ns':>12} {'median ns':>12}")
+    for result in results['results']:
+        print(f"{result['name']:>18} {result['board']:>11} {result['size']:>4} {result['fill']:>4}% {result['calls']:>8} "
+              f"{result['best_ns']:>12.0f} {result['median_ns']:>12.0f}")
+
+
+def compare(results, baseline, tolerance):
+    # Everything that is slower than the baseline by more than the tolerance
+    regressions = []
+    baseline_results = {(result['name'], result['board'], result['size'], result['fill']): result for result in baseline['results']}
+    for result in results['results']:
+        old = baseline_results.get((result['name'], result['board'], result['size'], result['fill']))
+        if old is not None and result['best_ns'] > old['best_ns'] * (1 + tolerance / 100):
+            regressions.append(f"{result['name']} on a {result['board']} of size {result['size']} at {result['fill']}% full: "
+                               f"{old['best_ns']:.0f}ns -> {result['best_ns']:.0f}ns")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark the board and AI hot paths.')
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help='comma separated benchmarks to run')
+    parser.add_argument('--sizes', default='1-10', help='board sizes, as a range like 1-10 or a list like 5,7')
+    parser.add_argument('--fills', default='0,25,50,75', help='comma separated percentages of the board to fill')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repeats of each measurement')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed repeats before the timed ones')
+    parser.add_argument('--min-time', type=float, default=0.01, help='shortest time in seconds each repeat runs for')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random positions')
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    names = args.benchmarks.split(',')
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark '{name}', choose from {', '.join(BENCHMARKS)}")
+    try:
+        sizes = parse_sizes(args.sizes)
+    except ValueError as error:
+        parser.error(str(error))
+    fills = [int(fill) for fill in args.fills.split(',')]
+
+    results = run(names, sizes, fills, args.repeat, args.warmup, args.min_time, args.seed)
+    report(results)
+    save_and_compare(results, args, compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Times the parallel root search at a fixed depth with 1 to N worker processes, to show how it scales.
+
+Usage (from the repository root): python -m benchmarks.parallel --size 10 --depth 5 --workers 4
+"""
+
+
+import argparse, os, time
+
+from engine import BitBoard, AlphaBetaAI, ParallelAI
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the parallel root search.')
+    parser.add_argument('--size', type=int, default=10, help='board size')
+    parser.add_argument('--depth', type=int, default=5, help='search depth')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='largest number of workers to try')
+    parser.add_argument('--opening', default='4,5,4,5,3', help='comma separated columns to play before searching')
+    args = parser.parse_args()
+
+    board = BitBoard(args.size)
+    for col in args.opening.split(','):
+        board.make_move(int(col))
+
+    # Single process search for reference. The search itself is what's being timed, so no book or solved table lookups
+    serial = AlphaBetaAI(board, depth=args.depth, book=False, solve_below=0)
+    start = time.perf_counter()
+    serial_move = serial.get_move()
+    serial_time = time.perf_counter() - start
+    print(f'serial     move {serial_move}  {serial_time:8.3f}s  {serial.nodes} nodes')
+
+    for workers in range(1, args.workers + 1):
+        ai = ParallelAI(board, depth=args.depth, workers=workers, book=False, solve_below=0)
+
+        # Start the pool before timing, as it persists between turns in a real game
+        ai.depth = 1
+        ai.get_move()
+        ai.depth = args.depth
+
+        start = time.perf_counter()
+        move = ai.get_move()
+        elapsed = time.perf_counter() - start
+        ai.close()
+
+        print(f'{workers:2} workers  move {move}  {elapsed:8.3f}s  {ai.nodes} nodes  speedup {serial_time / elapsed:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Builds the opening books the AI plays from: for every position reachable in the first few moves,
+the best reply found by an alpha-beta search given several times as long as the bot gets in a game,
+so the book is deeper than the bot's own search would be. Each size's book is saved to
+data/book_<size>.bin as a table sorted by position hash (see engine.PositionTable), with the depth
+each reply was searched to as its value.
+
+Usage: python book.py --sizes 1-10 --depth 4 --time 2000
+"""
+
+
+import argparse, os, time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import BitBoard, AlphaBetaAI, PositionTable, DATA_DIRECTORY, table_path, parse_sizes
+
+
+def opening_positions(size, depth):
+    # Move lists of every distinct position with fewer than depth counters that isn't finished
+    positions = {}
+    frontier = [[]]
+    for _ in range(depth):
+        next_frontier = []
+        for moves in frontier:
+            board = BitBoard(size)
+            for col in moves:
+                board.make_move(col)
+            if board.is_gameover() or board.hash in positions:
+                continue
+
+            positions[board.hash] = moves
+            next_frontier += [moves + [col] for col in board.get_valid_moves()]
+        frontier = next_frontier
+
+    return list(positions.values())
+
+
+def best_reply(size, moves, time_limit, search_depth):
+    board = BitBoard(size)
+    for col in moves:
+        board.make_move(col)
+    ai = AlphaBetaAI(board, time_limit, search_depth, book=False, solve_below=0)
+    return board.hash, ai.search(), ai.depth_reached
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build opening books for the AI.')
+    parser.add_argument('--sizes', default='1-10', help='board sizes, as a range like 1-10 or a list like 5,7')
+    parser.add_argument('--depth', type=int, default=4, help='number of moves into the game the book covers')
+    parser.add_argument('--time', type=int, default=2000, help='milliseconds to search each reply for, the GUI bot gets 500')
+    parser.add_argument('--search-depth', type=int, help='search each reply to this depth instead of for a time')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes to search in')
+    args = parser.parse_args()
+
+    try:
+        sizes = parse_sizes(args.sizes)
+    except ValueError as error:
+        parser.error(str(error))
+
+    os.makedirs(DATA_DIRECTORY, exist_ok=True)
+    with ProcessPoolExecutor(args.workers) as pool:
+        for size in sizes:
+            start = time.perf_counter()
+            positions = opening_positions(size, args.depth)
+            entries = list(pool.map(best_reply, [size] * len(positions), positions, [args.time] * len(positions),
+                                    [args.search_depth] * len(positions), chunksize=8))
+
+            path = table_path('book', size, size)
+            PositionTable.save(path, entries)
+            print(f'{size}x{size}: {len(entries)} positions in {time.perf_counter() - start:.1f}s -> {path}')
+
+
+if __name__ == '__main__':
+    main()
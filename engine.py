@@ -0,0 +1,1120 @@
+"""
+The rules engine for Four In A Row: the board, the scoring and the AI.
+It has no GUI dependencies, so games can be simulated without a display. Boards report
+committed moves to their listeners, which is how the GUI in main.py keeps itself up to date.
+"""
+
+
+import math, multiprocessing, os, random, struct, time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
+
+# Random 64 bit keys for each player's counter in each cell, per board width and height
+zobrist_keys = {}
+
+
+def get_zobrist_keys(width, height):
+    if (width, height) not in zobrist_keys:
+        # Seeded so hashes are the same every run. Square boards keep the seed the opening books were built with
+        rng = random.Random(width if width == height else f'{width}x{height}')
+        zobrist_keys[width, height] = tuple([rng.getrandbits(64) for _ in range(width * height)] for _ in range(2))
+    return zobrist_keys[width, height]
+
+
+# Windows of four cells in the horizontal, vertical, positive diagonal and negative diagonal directions
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# How much a window with 0 to 4 of a player's counters (and none of the opponent's) is worth.
+# Finished four in a rows are already counted in the points
+THREAT_WEIGHTS = (0, 0, 1, 4, 0)
+
+# Largest board width or height that's supported, as moves are recorded in a byte and the window
+# tables grow with the number of cells
+MAX_SIZE = 50
+
+# Columns from the centre out, per board width, as centre columns take part in the most four in a rows
+centre_orders = {}
+
+
+def get_centre_order(width):
+    if width not in centre_orders:
+        centre = (width - 1) / 2
+        centre_orders[width] = tuple(sorted(range(width), key=lambda col: abs(col - centre)))
+    return centre_orders[width]
+
+
+def centre_moves(board):
+    # Columns that aren't full, centre first
+    legal = board.legal
+    return [col for col in get_centre_order(board.width) if legal >> col & 1]
+
+
+# Window indexes are only built once per board width and height, then shared by every board and canvas
+window_indexes = {}
+
+
+def get_window_index(width, height):
+    if (width, height) not in window_indexes:
+        window_indexes[width, height] = WindowIndex(width, height)
+    return window_indexes[width, height]
+
+
+class WindowIndex:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        # Per window: its cells, its direction, the canvas items of its cells (the canvas draws
+        # rows from the top) and its cells' bits on a BitBoard. Per cell: the windows through it and
+        # the cell's offset from the start of each one, in the form HiddenBoard.score reports connections
+        self.windows = []
+        self.directions = []
+        self.items = []
+        self.masks = []
+        self.cell_windows = [[] for _ in range(width * height)]
+        self.cell_offsets = [[] for _ in range(width * height)]
+        self.starts = [[None] * (width * height) for _ in DIRECTIONS]
+
+        for direction, (dc, dr) in enumerate(DIRECTIONS):
+            for col in range(width):
+                for row in range(height):
+                    cells = tuple((col + dc * i, row + dr * i) for i in range(4))
+                    if not all(0 <= c < width and 0 <= r < height for c, r in cells):
+                        continue
+
+                    window = len(self.windows)
+                    for i, (c, r) in enumerate(cells):
+                        self.cell_windows[c * height + r].append(window)
+                        self.cell_offsets[c * height + r].append((direction, -i))
+                    self.starts[direction][col * height + row] = window
+                    self.windows.append(cells)
+                    self.directions.append(direction)
+                    self.items.append(tuple((height - r - 1) * width + c for c, r in cells))
+                    self.masks.append(sum(1 << c * (height + 1) + r for c, r in cells))
+
+
+    def window_at(self, direction, col, row, offset):
+        # The window a connection offset from HiddenBoard.score refers to
+        dc, dr = DIRECTIONS[direction]
+        return self.starts[direction][(col + dc * offset) * self.height + row + dr * offset]
+
+
+class HiddenBoard:
+    def __init__(self, width, height=None, debug=False):
+        # Boards are square unless given a height
+        self.width = width
+        self.height = width if height is None else height
+        self.listeners = []
+        self.debug = debug
+
+        self.cells = [[0] * self.height for _ in range(width)]
+        self.entries = [0] * width
+
+        # A bit for every column that isn't full, so move generation doesn't need to check each one
+        self.legal = (1 << width) - 1 if self.height else 0
+        self.points = [0, 0]
+        self.player = 1
+        self.history = []
+
+        # Zobrist hash of the counters on the board, kept up to date as counters are placed and removed
+        self.keys = get_zobrist_keys(width, self.height)
+        self.hash = 0
+
+        # Counters of each player in every window, and how many windows each player has with
+        # 0 to 4 counters and none of the opponent's. These are updated only for the windows
+        # through the changed cell, so the evaluation never needs a full rescan
+        self.index = get_window_index(width, self.height)
+        windows = len(self.index.windows)
+        self.counts = ([0] * windows, [0] * windows)
+        self.threats = ([windows, 0, 0, 0, 0], [windows, 0, 0, 0, 0])
+
+
+    def copy(self, board_type=None):
+        # Replay the moves onto a fresh board (of the same type unless told otherwise) that nothing is listening to
+        board = (board_type or type(self))(self.width, self.height, self.debug)
+        for col, _ in self.history:
+            board.make_move(col)
+        return board
+
+
+    def get_valid_moves(self):
+        return [col for col in range(self.width) if self.entries[col] != self.height]
+
+
+    def make_move(self, col, check=False):
+        # Update board
+        row = self.entries[col]
+        self.place(col, row)
+
+        # Calculate points
+        points, connections = self.score(col, row)
+
+        # Undo move and return point count
+        if check:
+            self.remove(col, row)
+            return points
+        
+        else:
+            # Update points and change turn
+            self.points[self.player - 1] += points
+            self.player = 3 - self.player
+            self.history.append((col, points))
+
+            # Let whoever is watching the board (e.g. the GUI) know about the move
+            for listener in self.listeners:
+                listener(col, row, connections)
+
+
+    def unmake_move(self):
+        col, points = self.history.pop()
+
+        # Change turn back and take away the move's points
+        self.player = 3 - self.player
+        self.points[self.player - 1] -= points
+        self.remove(col, self.entries[col] - 1)
+
+
+    def place(self, col, row):
+        self.cells[col][row] = self.player
+        self.entries[col] += 1
+        if self.entries[col] == self.height:
+            self.legal &= ~(1 << col)
+        self.hash ^= self.keys[self.player - 1][col * self.height + row]
+        self.update_windows(col, row, 1)
+
+
+    def remove(self, col, row):
+        self.cells[col][row] = 0
+        self.entries[col] -= 1
+        self.legal |= 1 << col
+        self.hash ^= self.keys[self.player - 1][col * self.height + row]
+        self.update_windows(col, row, -1)
+
+
+    def update_windows(self, col, row, change):
+        counts, opponent_counts = self.counts[self.player - 1], self.counts[2 - self.player]
+        threats, opponent_threats = self.threats[self.player - 1], self.threats[2 - self.player]
+
+        for window in self.index.cell_windows[col * self.height + row]:
+            count, opponent_count = counts[window], opponent_counts[window]
+
+            # Window stops (or starts) being open to the opponent
+            if count == 0 and change == 1 or count == 1 and change == -1:
+                opponent_threats[opponent_count] -= change
+            if opponent_count == 0:
+                threats[count] -= 1
+                threats[count + change] += 1
+
+            counts[window] = count + change
+
+        if self.debug and self.threats != self.count_threats():
+            raise AssertionError(f'Incremental threats {self.threats} differ from a full rescan {self.count_threats()}')
+
+
+    def count_threats(self):
+        # Rescan every window, for checking the incremental counts
+        threats = ([0] * 5, [0] * 5)
+        for window in self.index.windows:
+            stones = [self.cells[col][row] for col, row in window]
+            if 2 not in stones:
+                threats[0][stones.count(1)] += 1
+            if 1 not in stones:
+                threats[1][stones.count(2)] += 1
+        return threats
+
+
+    def evaluation(self):
+        # Partial four in a rows of player 1 minus those of player 2
+        return sum(weight * (ours - theirs) for weight, ours, theirs in zip(THREAT_WEIGHTS, *self.threats))
+
+
+    def score(self, col, row):
+        connections = ([], [], [], [])
+        points = 0
+
+        # Any window through the cell that the player now fills is a new four in a row
+        counts = self.counts[self.player - 1]
+        cell = col * self.height + row
+        for window, (direction, offset) in zip(self.index.cell_windows[cell], self.index.cell_offsets[cell]):
+            if counts[window] == 4:
+                connections[direction].append(offset)
+                points += 1
+
+        return points, connections
+
+
+    def is_gameover(self):
+        return sum(self.entries) == self.width * self.height
+
+
+    def is_ongoing(self):
+        return sum(self.entries) > 0 and not self.is_gameover()
+
+
+# Keeps each player's counters as bits instead of window counts, so moves are quicker to make and score.
+# Only the evaluation needs the counts, so searches that evaluate positions copy the board to a HiddenBoard
+class BitBoard(HiddenBoard):
+    def __init__(self, width, height=None, debug=False):
+        super().__init__(width, height, debug)
+        self.counts = self.threats = None
+
+        # Each player's counters as bits, column by column, with a spare bit on top of
+        # every column so shifts never wrap into the next one
+        self.bits = [0, 0]
+        self.shifts = (self.height + 1, 1, self.height + 2, self.height)
+
+
+    def update_windows(self, col, row, change):
+        # Called as a counter is placed and removed, and flipping the cell's bit does either
+        self.bits[self.player - 1] ^= 1 << col * (self.height + 1) + row
+
+
+    def evaluation(self):
+        # There are no window counts to read, so rescan them
+        return sum(weight * (ours - theirs) for weight, ours, theirs in zip(THREAT_WEIGHTS, *self.count_threats()))
+
+
+    def score(self, col, row):
+        connections = ([], [], [], [])
+        points = 0
+
+        # Only the windows through the cell can be new four in a rows, so just their bits are checked
+        bits = self.bits[self.player - 1]
+        masks = self.index.masks
+        cell = col * self.height + row
+        for window, (direction, offset) in zip(self.index.cell_windows[cell], self.index.cell_offsets[cell]):
+            if bits & masks[window] == masks[window]:
+                connections[direction].append(offset)
+                points += 1
+
+        return points, connections
+
+
+# Opening books and solved tables are files of (position hash, move, value) entries sorted by
+# hash, kept in the data directory and loaded the first time a size needs them
+TABLE_ENTRY = struct.Struct('<QBb')
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+position_tables = {}
+
+
+class PositionTable:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data) // TABLE_ENTRY.size
+
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls(file.read())
+
+
+    @staticmethod
+    def save(path, entries):
+        # Entries are (hash, move, value) tuples
+        with open(path, 'wb') as file:
+            for entry in sorted(entries):
+                file.write(TABLE_ENTRY.pack(*entry))
+
+
+    def lookup(self, key):
+        # Binary search for the position, giving its (move, value)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, move, value = TABLE_ENTRY.unpack_from(self.data, middle * TABLE_ENTRY.size)
+            if entry_key == key:
+                return move, value
+            elif entry_key < key:
+                low = middle + 1
+            else:
+                high = middle
+
+
+def table_path(name, width, height):
+    # name is 'book' for opening books or 'solved' for solved tables. Square boards go by their size alone
+    return os.path.join(DATA_DIRECTORY, f'{name}_{width}.bin' if width == height else f'{name}_{width}x{height}.bin')
+
+
+def get_position_table(name, width, height):
+    if (name, width, height) not in position_tables:
+        path = table_path(name, width, height)
+        position_tables[name, width, height] = PositionTable.load(path) if os.path.exists(path) else None
+    return position_tables[name, width, height]
+
+
+class Solver:
+    def __init__(self, max_entries=2 ** 16):
+        # Lower and upper bounds on the final point difference of every position seen, for the player to move.
+        # Kept between moves, as the next move's positions are mostly ones already seen, but only up to
+        # max_entries (about 8MB), since bots can live as long as the process they're in
+        self.bounds = {}
+        self.max_entries = max_entries
+        self.nodes = 0
+
+
+    def solve(self, board):
+        # Move that maximises the final point difference, and that difference
+        if len(self.bounds) > self.max_entries:
+            self.bounds.clear()
+
+        alpha, best_move = -float('inf'), None
+        for move in self.order_moves(board):
+            board.make_move(move)
+            value = -self.negamax(board, -float('inf'), -alpha)
+            board.unmake_move()
+            if value > alpha:
+                alpha, best_move = value, move
+
+        return best_move, alpha
+
+
+    def negamax(self, board, alpha, beta):
+        self.nodes += 1
+
+        if board.is_gameover():
+            return board.points[board.player - 1] - board.points[2 - board.player]
+
+        lower, upper = self.bounds.get(board.hash, (-float('inf'), float('inf')))
+        if lower >= beta or lower == upper:
+            return lower
+        if upper <= alpha:
+            return upper
+        alpha, beta = max(alpha, lower), min(beta, upper)
+        window_alpha, window_beta = alpha, beta
+
+        best = -float('inf')
+        for move in self.order_moves(board):
+            board.make_move(move)
+            best = max(best, -self.negamax(board, -beta, -alpha))
+            board.unmake_move()
+            alpha = max(alpha, best)
+            if alpha >= beta:
+                break
+
+        # Tighten what's known about the position
+        if best <= window_alpha:
+            upper = min(upper, best)
+        elif best >= window_beta:
+            lower = max(lower, best)
+        else:
+            lower = upper = best
+        self.bounds[board.hash] = (lower, upper)
+        return best
+
+
+    def order_moves(self, board):
+        return centre_moves(board)
+
+
+class MoveGenerator:
+    def __init__(self):
+        # Two killer moves per ply (moves that caused a cutoff in another position at the same
+        # ply), and a score per player and column that grows with every cutoff the move causes
+        self.killers = {}
+        self.history = {}
+
+        # Cutoffs, and how many of them the first move tried caused
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+
+    def new_search(self):
+        # Killers only last one search, while history is halved so older searches count for less
+        self.killers = {}
+        self.history = {key: score // 2 for key, score in self.history.items() if score > 1}
+        self.cutoffs = self.first_cutoffs = 0
+
+
+    def order(self, board, first=None):
+        # The given move first (e.g. from the transposition table), then the killers, then the rest
+        # by history. Sorting is stable, so moves without any history stay centre first
+        moves = centre_moves(board)
+        if self.history:
+            history, player = self.history, board.player
+            moves.sort(key=lambda col: -history.get((player, col), 0))
+
+        for move in reversed([first] + self.killers.get(len(board.history), [])):
+            if move in moves:
+                moves.remove(move)
+                moves.insert(0, move)
+        return moves
+
+
+    def cutoff(self, board, move, depth, index):
+        # move was the index-th tried at a node searched to depth, and was good enough to stop there
+        self.cutoffs += 1
+        self.first_cutoffs += index == 0
+
+        killers = self.killers.setdefault(len(board.history), [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+        key = (board.player, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+
+    def first_cutoff_rate(self):
+        return self.first_cutoffs / self.cutoffs if self.cutoffs else None
+
+
+class AI:
+    def __init__(self, board, book=True, solve_below=13):
+        self.board = board
+        self.book = book
+
+        # Once fewer cells than this are empty the rest of the game is solved exactly
+        self.solve_below = solve_below
+        self.solver = Solver()
+
+        # Function that says when to give up searching early, e.g. when pondering is no longer wanted
+        self.stop = None
+
+        # Work done for the last move, see get_move
+        self.table = None
+        self.generator = None
+        self.nodes = 0
+        self.depth_reached = 0
+        self.stats = {}
+
+
+    def get_move(self):
+        start = time.perf_counter()
+        self.nodes = self.depth_reached = 0
+        table = self.table
+        hits, misses, collisions = (table.hits, table.misses, table.collisions) if table is not None else (0, 0, 0)
+
+        move, source = self.choose_move()
+
+        # Kept for the instrumentation, it's only worked out once a move so costs next to nothing
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        lookups = table.hits + table.misses - hits - misses if table is not None else 0
+        self.stats = {
+            'source': source, 'move': move, 'time_ms': elapsed * 1000, 'nodes': self.nodes, 'nps': self.nodes / elapsed,
+            'depth': self.depth_reached, 'hit_rate': (table.hits - hits) / lookups if lookups else None,
+            # Transposition table lookups that missed, and those that missed because another position had the slot
+            'misses': table.misses - misses if table is not None else None,
+            'collisions': table.collisions - collisions if table is not None else None,
+            # Effective branching factor: the number of children per node that gives this many nodes
+            'branching': self.nodes ** (1 / self.depth_reached) if self.depth_reached else None,
+            # How often the first move tried was good enough for a cutoff, the higher the better the ordering
+            'first_cutoff_rate': self.generator.first_cutoff_rate() if source == 'search' and self.generator is not None else None
+        }
+        return move
+
+
+    def choose_move(self):
+        # Play straight from the opening book or solved table if the position is in one
+        for name in ('solved', 'book') if self.book else ():
+            table = get_position_table(name, self.board.width, self.board.height)
+            entry = table.lookup(self.board.hash) if table is not None else None
+
+            # Book values are the depth the move was searched to, and ones shallower than this bot searches are no help
+            if entry is not None and (name == 'solved' or entry[1] >= self.book_depth()):
+                return entry[0], name
+
+        empty = self.board.width * self.board.height - sum(self.board.entries)
+        if empty < self.solve_below:
+            nodes = self.solver.nodes
+            move = self.solver.solve(self.board.copy())[0]
+            self.nodes, self.depth_reached = self.solver.nodes - nodes, empty
+            return move, 'solver'
+
+        return self.search(), 'search'
+
+
+    def book_depth(self):
+        # Shallowest book search worth playing instead of searching, books are built deeper than timed searches reach
+        return 0
+
+    
+    def search(self):
+        points = ()
+
+        # Columns in centered order, leaving out full ones
+        moves = centre_moves(self.board)
+
+        # Check for points each move would generate
+        for move in moves:
+            points += (self.board.make_move(move, True),)
+        self.nodes, self.depth_reached = len(moves), 1
+
+        # If there are no points for the AI, try block the opponent
+        if max(points) < 1:
+            points = ()
+            self.board.player = 3 - self.board.player
+            for move in moves:
+                points += (self.board.make_move(move, True),)
+            self.board.player = 3 - self.board.player
+            self.nodes += len(moves)
+
+        return moves[points.index(max(points))]
+
+
+TableEntry = namedtuple('TableEntry', 'key depth value bound move')
+EXACT, LOWER, UPPER = range(3)
+
+# How much a point is worth compared to the partial four in a rows of the evaluation
+POINT_WEIGHT = 100
+
+
+class TranspositionTable:
+    def __init__(self, entries=2 ** 16):
+        # Pairs of slots: the first keeps the deepest search, the second is always replaced
+        self.buckets = max(entries // 2, 1)
+        self.slots = [None] * (self.buckets * 2)
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+
+    def probe(self, key):
+        index = key % self.buckets * 2
+        for entry in self.slots[index:index + 2]:
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+
+        # A different position is using the bucket
+        if self.slots[index] is not None:
+            self.collisions += 1
+        self.misses += 1
+
+
+    def store(self, key, depth, value, bound, move):
+        index = key % self.buckets * 2
+        entry = self.slots[index]
+        if entry is None or entry.key == key or depth >= entry.depth:
+            self.slots[index] = TableEntry(key, depth, value, bound, move)
+        else:
+            self.slots[index + 1] = TableEntry(key, depth, value, bound, move)
+
+
+    def clear(self):
+        self.slots = [None] * (self.buckets * 2)
+        self.hits = self.misses = self.collisions = 0
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class AlphaBetaAI(AI):
+    def __init__(self, board, time_limit=1000, depth=None, table_size=2 ** 16, book=True, solve_below=13):
+        super().__init__(board, book, solve_below)
+        self.time_limit = time_limit
+        self.depth = depth
+        self.table = TranspositionTable(table_size)
+        self.generator = MoveGenerator()
+        self.deadline = None
+
+
+    def search(self):
+        # Search a copy so the real board (and anything listening to it) is left alone, as a
+        # HiddenBoard so evaluating the leaves only reads its window counts
+        board = self.board.copy(HiddenBoard)
+        moves = self.order_moves(board)
+        best_move = moves[0]
+        self.generator.new_search()
+
+        # Deepen one ply at a time until the time runs out, keeping the last complete result.
+        # The first ply is always finished so there is a sensible move to fall back on
+        deadline = time.perf_counter() + self.time_limit / 1000
+        max_depth = board.width * board.height - sum(board.entries)
+        self.nodes = 0
+        for depth in range(1, min(max_depth, self.depth or max_depth) + 1):
+            self.deadline = deadline if depth > 1 and self.depth is None else None
+            try:
+                best_move = self.search_root(board, moves, depth)
+            except SearchTimeout:
+                break
+            self.depth_reached = depth
+
+            if self.depth is None and time.perf_counter() >= deadline:
+                break
+
+            # Search the best move first next time round
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        return best_move
+
+
+    def search_root(self, board, moves, depth):
+        alpha, beta = -float('inf'), float('inf')
+        best_move = moves[0]
+
+        for move in moves:
+            board.make_move(move)
+            value = -self.negamax(board, depth - 1, -beta, -alpha)
+            board.unmake_move()
+            if value > alpha:
+                alpha = value
+                best_move = move
+
+        return best_move
+
+
+    def negamax(self, board, depth, alpha, beta):
+        self.nodes += 1
+
+        # Only look at the clock every so often, it's slow compared to a node
+        if self.nodes & 1023 == 0 and (self.deadline is not None and time.perf_counter() >= self.deadline or
+                                       self.stop is not None and self.stop()):
+            raise SearchTimeout
+
+        if depth == 0 or board.is_gameover():
+            return self.evaluate(board)
+
+        # Use what's known about the position from other move orders
+        original_alpha = alpha
+        entry = self.table.probe(board.hash)
+        if entry is not None and entry.depth >= depth:
+            if entry.bound == EXACT:
+                return entry.value
+            elif entry.bound == LOWER:
+                alpha = max(alpha, entry.value)
+            else:
+                beta = min(beta, entry.value)
+            if alpha >= beta:
+                return entry.value
+
+        # Try the previous best move first, then killer moves and moves with a good history
+        moves = self.generator.order(board, entry.move if entry is not None else None)
+
+        best, best_move = -float('inf'), moves[0]
+        for i, move in enumerate(moves):
+            board.make_move(move)
+            value = -self.negamax(board, depth - 1, -beta, -alpha)
+            board.unmake_move()
+            if value > best:
+                best, best_move = value, move
+            if value >= beta:
+                self.generator.cutoff(board, move, depth, i)
+                break
+            alpha = max(alpha, value)
+
+        bound = UPPER if best <= original_alpha else LOWER if best >= beta else EXACT
+        self.table.store(board.hash, depth, best, bound, best_move)
+        return best
+
+
+    def evaluate(self, board):
+        # Point difference, then partial four in a rows, from the point of view of the player to move
+        evaluation = POINT_WEIGHT * (board.points[0] - board.points[1]) + board.evaluation()
+        return evaluation if board.player == 1 else -evaluation
+
+
+    def order_moves(self, board):
+        # Centre columns first, as they take part in the most four in a rows
+        return centre_moves(board)
+
+
+    def book_depth(self):
+        return self.depth or 0
+
+
+# State of each process in a ParallelAI pool: the alpha bound and stop flag shared between them, a searcher per
+# board width and height so transposition tables last between turns, and the position each last searched
+worker_alpha = None
+worker_stopped = None
+worker_ais = {}
+worker_histories = {}
+
+
+def init_worker(alpha, stopped):
+    global worker_alpha, worker_stopped
+    worker_alpha = alpha
+    worker_stopped = stopped
+
+
+def worker_stop():
+    return worker_stopped.value
+
+
+def search_root_move(width, height, history, move, depth, deadline):
+    # Don't start on moves still queued when the time ran out or the search was stopped
+    if deadline is not None and time.perf_counter() >= deadline or worker_stopped.value:
+        return None
+
+    board = HiddenBoard(width, height)
+    for col in history:
+        board.make_move(col)
+
+    if (width, height) not in worker_ais:
+        worker_ais[width, height] = AlphaBetaAI(None)
+        worker_ais[width, height].stop = worker_stop
+    ai = worker_ais[width, height]
+    ai.deadline = deadline
+
+    # A new position means a new turn (or game), and killers are kept by ply so only last one turn
+    if worker_histories.get((width, height)) != history:
+        ai.generator.new_search()
+        worker_histories[width, height] = history
+
+    ai.nodes = 0
+
+    # Only moves that beat the best so far (from any process) need an exact value
+    alpha = worker_alpha.value
+    board.make_move(move)
+    try:
+        value = -ai.negamax(board, depth - 1, -float('inf'), -alpha)
+    except SearchTimeout:
+        return None
+
+    with worker_alpha.get_lock():
+        worker_alpha.value = max(worker_alpha.value, value)
+
+    return value, value > alpha, ai.nodes
+
+
+class ParallelAI(AlphaBetaAI):
+    def __init__(self, board, time_limit=1000, depth=None, workers=None, book=True, solve_below=13):
+        super().__init__(board, time_limit, depth, book=book, solve_below=solve_below)
+        self.workers = workers or os.cpu_count()
+
+        # Started on the first move and kept between turns
+        self.pool = None
+        self.alpha = None
+        self.stopped = None
+
+
+    def search(self):
+        if self.pool is None:
+            self.alpha = multiprocessing.Value('d', -float('inf'))
+            self.stopped = multiprocessing.Value('b', False)
+            self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.alpha, self.stopped))
+        self.stopped.value = False
+
+        history = [col for col, _ in self.board.history]
+        moves = self.order_moves(self.board)
+        best_move = moves[0]
+
+        # Same iterative deepening as AlphaBetaAI, but with the root moves shared between processes
+        deadline = time.perf_counter() + self.time_limit / 1000
+        max_depth = self.board.width * self.board.height - sum(self.board.entries)
+        self.nodes = 0
+        for depth in range(1, min(max_depth, self.depth or max_depth) + 1):
+            self.alpha.value = -float('inf')
+            futures = [self.pool.submit(search_root_move, self.board.width, self.board.height, history, move, depth,
+                                        deadline if depth > 1 and self.depth is None else None) for move in moves]
+            self.wait(futures)
+            results = [future.result() for future in futures]
+            if None in results:
+                break
+
+            # Moves that failed low only have an upper bound, so an exact value wins a tie
+            best = max(range(len(moves)), key=lambda i: results[i][:2])
+            best_move = moves[best]
+            self.nodes += sum(result[2] for result in results)
+            self.depth_reached = depth
+
+            if self.depth is None and time.perf_counter() >= deadline or self.stop is not None and self.stop():
+                break
+
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        return best_move
+
+
+    def wait(self, futures):
+        # The stop condition can't be sent to the workers, so check it here and pass it on through
+        # the shared flag, which they check as often as the clock
+        if self.stop is None:
+            wait(futures)
+            return
+        pending = futures
+        while pending:
+            pending = wait(pending, timeout=0.01)[1]
+            if pending and self.stop():
+                self.stopped.value = True
+
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+
+# Monte Carlo tree search: rather than judging positions with an evaluation, play lots of random games
+# from them, growing a tree towards the moves that win most often (picked by UCT)
+class Node:
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins')
+
+
+    def __init__(self, move, parent, untried):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+
+        # Playouts through the node, and how many the player who made its move won (draws count half)
+        self.visits = 0
+        self.wins = 0
+
+
+class MCTSAI(AI):
+    def __init__(self, board, time_limit=1000, playouts=None, exploration=70, book=True, solve_below=13):
+        super().__init__(board, book, solve_below)
+        if playouts is not None and playouts < 1:
+            raise ValueError(f'MCTS needs at least 1 playout, not {playouts}')
+        self.time_limit = time_limit
+        self.playouts = playouts
+
+        # UCT exploration constant, in hundredths so it can be given in a spec
+        self.exploration = exploration / 100
+        self.rng = random.Random(0)
+
+        # Tree kept between turns, the moves that lead to its root and the board size it's for
+        self.root = None
+        self.root_history = []
+        self.root_size = None
+
+
+    def get_move(self):
+        move = super().get_move()
+        if self.stats['source'] == 'search':
+            self.stats['playouts'] = self.nodes
+            self.stats['playouts_per_second'] = self.stats['nps']
+        return move
+
+
+    def search(self):
+        # The tree is searched with just each player's bits and the height of each column, as
+        # that's all a playout needs, and it's far quicker to update than a whole board
+        history = [col for col, _ in self.board.history]
+        board = BitBoard(self.board.width, self.board.height)
+        for col in history:
+            board.make_move(col)
+
+        self.height, self.stride, self.shifts = board.height, board.height + 1, board.shifts
+        self.order = get_centre_order(board.width)[::-1]
+        self.full = sum(((1 << board.height) - 1) << col * self.stride for col in range(board.width))
+        root = self.reuse_tree(history, board)
+
+        # Playouts until the time or playout budget runs out (or it's told to stop), checking the clock every so often
+        deadline = time.perf_counter() + self.time_limit / 1000
+        playouts = 0
+        while self.playouts is None or playouts < self.playouts:
+            if playouts and playouts & 63 == 0 and (time.perf_counter() >= deadline or self.stop is not None and self.stop()):
+                break
+            self.iterate(root, board.bits[:], board.entries[:], board.player)
+            playouts += 1
+
+        self.nodes = playouts
+        self.depth_reached = self.tree_depth(root)
+
+        # The most visited move is the most reliable one
+        return max(root.children, key=lambda child: child.visits).move
+
+
+    def untried(self, entries):
+        # Columns that aren't full, centre last as they're popped off the end
+        return [col for col in self.order if entries[col] < self.height]
+
+
+    def reuse_tree(self, history, board):
+        # Follow the moves made since the last search down the old tree, keeping the subtree
+        # that's left if the position is in it (and the board is the same size)
+        node = self.root
+        size = (board.width, board.height)
+        if node is not None and size == self.root_size and history[:len(self.root_history)] == self.root_history:
+            for col in history[len(self.root_history):]:
+                node = next((child for child in node.children if child.move == col), None)
+                if node is None:
+                    break
+        else:
+            node = None
+
+        if node is None:
+            node = Node(None, None, self.untried(board.entries))
+        node.parent = None
+        self.root, self.root_history, self.root_size = node, history, size
+        return node
+
+
+    def iterate(self, root, bits, entries, player):
+        # Selection: follow the best UCT child down to a node that still has moves to try
+        node = root
+        while not node.untried and node.children:
+            log_visits = self.exploration * math.log(node.visits) ** 0.5
+            node = max(node.children, key=lambda child: child.wins / child.visits + log_visits / child.visits ** 0.5)
+            bits[player - 1] |= 1 << node.move * self.stride + entries[node.move]
+            entries[node.move] += 1
+            player = 3 - player
+
+        # Expansion: add one of the moves not tried yet, centre first
+        if node.untried:
+            move = node.untried.pop()
+            bits[player - 1] |= 1 << move * self.stride + entries[move]
+            entries[move] += 1
+            player = 3 - player
+            node.children.append(Node(move, node, self.untried(entries)))
+            node = node.children[-1]
+
+        # Simulation, then backpropagation, from the point of view of whoever made each node's move
+        result = self.playout(bits, player)
+        while node is not None:
+            node.visits += 1
+            node.wins += result
+            result = 1 - result
+            node = node.parent
+
+
+    def playout(self, bits, player):
+        # A player's points once the board is full only depend on which cells they own, not the order
+        # they were filled in. So rather than playing random moves, the empty cells are shared out at
+        # random all at once, the player to move getting the odd one as they would in a real game. That
+        # skips gravity, so it's not quite a random game, but it's many times faster. The result is for
+        # the player who made the last move: 1 for a win, 0.5 for a draw and 0 for a loss
+        empty = self.full & ~(bits[0] | bits[1])
+        shared = self.rng.getrandbits(self.full.bit_length()) & empty
+
+        # Flipping a coin per cell rarely gives an even split, so hand cells over at random until it is
+        surplus = shared.bit_count() - empty.bit_count() // 2
+        if surplus:
+            source = shared if surplus > 0 else empty ^ shared
+            cells = [cell for cell, bit in enumerate(bin(source)[:1:-1]) if bit == '1']
+            for cell in self.rng.sample(cells, abs(surplus)):
+                shared ^= 1 << cell
+
+        last = bits[2 - player] | shared
+        upcoming = bits[player - 1] | empty ^ shared
+
+        last_points, next_points = 0, 0
+        for shift in self.shifts:
+            last_points += (last & last >> shift & last >> 2 * shift & last >> 3 * shift).bit_count()
+            next_points += (upcoming & upcoming >> shift & upcoming >> 2 * shift & upcoming >> 3 * shift).bit_count()
+        return 1 if last_points > next_points else 0.5 if last_points == next_points else 0
+
+
+    def tree_depth(self, node):
+        # Length of the line the most visits went down
+        depth = 0
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            depth += 1
+        return depth
+
+
+def parse_size(text):
+    # Board sizes look like '7' for a square board or '7x6' for 7 columns of 6 rows
+    width, _, height = text.lower().partition('x')
+    width, height = int(width), int(height or width)
+    if not (1 <= width <= MAX_SIZE and 1 <= height <= MAX_SIZE):
+        raise ValueError(f'Boards can be 1 to {MAX_SIZE} cells each way, not {width}x{height}')
+    return width, height
+
+
+def parse_sizes(text):
+    # Lists of square board sizes look like a range such as '4-10' or a list such as '5,7'
+    try:
+        if '-' in text:
+            low, high = map(int, text.split('-'))
+            sizes = list(range(low, high + 1))
+        else:
+            sizes = [int(size) for size in text.split(',')]
+    except ValueError:
+        raise ValueError(f'Board sizes should be a range like 4-10 or a list like 5,7, not {text!r}') from None
+
+    if not sizes or not all(1 <= size <= MAX_SIZE for size in sizes):
+        raise ValueError(f'Boards can be 1 to {MAX_SIZE} cells each way, not {text!r}')
+    return sizes
+
+
+# Bots by name, for choosing them from the command line
+AIS = {'greedy': AI, 'alphabeta': AlphaBetaAI, 'parallel': ParallelAI, 'mcts': MCTSAI}
+
+
+def create_ai(board, spec):
+    # Specs look like 'alphabeta' or 'alphabeta:time_limit=100,depth=4'
+    name, _, options = spec.partition(':')
+    if name not in AIS:
+        raise ValueError(f'Unknown AI {name!r}, expected one of {", ".join(AIS)}')
+
+    kwargs = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        kwargs[key] = int(value)
+    return AIS[name](board, **kwargs)
+
+
+# Bots kept in a background process between turns, by spec, so their tables aren't thrown away
+background_ais = {}
+
+# Moves and stats the bot worked out during the opponent's turn, by position, and the number of the
+# turn being pondered. That's shared with the process running the game, which changes it to stop pondering
+pondered = {}
+ponder_turn = None
+
+
+def init_background(turn):
+    global ponder_turn
+    ponder_turn = turn
+
+
+def get_background_ai(board, spec):
+    if spec not in background_ais:
+        background_ais[spec] = create_ai(board, spec)
+    ai = background_ais[spec]
+    ai.board = board
+    return ai
+
+
+def close_background():
+    # Shut down the process pools of any bots kept here, as the process can't exit while they're running
+    for ai in background_ais.values():
+        if hasattr(ai, 'close'):
+            ai.close()
+    background_ais.clear()
+
+
+def find_move(width, height, history, spec):
+    # For running a bot in another process: use the move worked out while pondering if there
+    # is one, otherwise rebuild the board from its moves and search it
+    key = (width, height, tuple(history), spec)
+    if key in pondered:
+        return pondered.pop(key)
+
+    board = BitBoard(width, height)
+    for col in history:
+        board.make_move(col)
+
+    ai = get_background_ai(board, spec)
+    ai.stop = None
+    return ai.get_move(), ai.stats
+
+
+def likely_replies(board):
+    # Moves that score the most for the player to move first, then centre first
+    return sorted(centre_moves(board), key=lambda col: -board.make_move(col, True))
+
+
+def ponder(width, height, history, spec, turn):
+    # Work out the bot's move after each of the opponent's likely moves, until the turn number changes.
+    # Run in the same process as find_move so the results (and the bot's tables) are there for it
+    pondered.clear()
+    board = BitBoard(width, height)
+    for col in history:
+        board.make_move(col)
+
+    ai = get_background_ai(board, spec)
+    ai.stop = lambda: ponder_turn.value != turn
+    for reply in likely_replies(board):
+        if ai.stop():
+            break
+
+        board.make_move(reply)
+        if not board.is_gameover():
+            move = ai.get_move()
+
+            # A search stopped part way isn't kept, but what it put in the transposition table still speeds up the real one
+            if not ai.stop():
+                pondered[width, height, tuple(history) + (reply,), spec] = move, dict(ai.stats, source='ponder')
+        board.unmake_move()
+
+    ai.stop = None
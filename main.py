@@ -9,29 +9,75 @@ UPI: msch213
 """
 
 
-import sys, time, tkinter as tk
-from tkinter import messagebox
+import argparse, multiprocessing, sys, tkinter as tk
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from tkinter import messagebox, simpledialog
 from idlelib.tooltip import Hovertip
 
+from engine import BitBoard, AI, find_move, create_ai, init_background, close_background, ponder, parse_size, MAX_SIZE
+from records import RecordWriter, BOT_2
+from stats import Instrumentation, format_stats
+
 
 class FourInARow:
-    def __init__(self):
+    def __init__(self, workers=1, record=None, stats=None, ai=None):
         self.window = tk.Tk()
         self.window.title('Four In A Row! - msch213')
         self.window.resizable(False, False)
 
+        self.players = 0
+        self.can_move = False
+
         self.preferences = Preferences(self)
-        self.board = HiddenBoard(self, 0)
-        self.canvas = VisualBoard(self, 0)
+        self.board = BitBoard(0)
+        self.canvas = VisualBoard(self, 0, 0)
         self.menu = Menu(self)
-        self.ai = AI(self)
 
-        self.players = 0
-        self.can_move = False
+        # The bot thinks in another process so the window stays responsive. It is kept between
+        # turns and games so its process (and any process pool of its own) doesn't restart. While
+        # it's the human's turn the bot ponders its replies, until the turn number changes
+        self.ai = ai or (f'parallel:time_limit=500,workers={workers}' if workers > 1 else 'alphabeta:time_limit=500')
+        self.turn = multiprocessing.Value('i', 0)
+        self.executor = None
+        self.start_executor()
+        self.thinking = None
+
+        # Finished games are appended to the record file, if there is one
+        self.recorder = RecordWriter(record) if record else None
+
+        # Bot and rendering stats are collected while the stats panel is shown or a stats file is given
+        self.instruments = Instrumentation(stats)
+        self.instrument(stats is not None)
 
         self.create_menubar()
         self.window.mainloop()
 
+        # The bot's own process pool has to be shut down from its process, or that process never exits
+        self.stop_pondering()
+        try:
+            self.executor.submit(close_background).result()
+        except BrokenProcessPool:
+            pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.recorder is not None:
+            self.recorder.close()
+        self.instruments.close()
+
+
+    def start_executor(self):
+        self.executor = ProcessPoolExecutor(1, initializer=init_background, initargs=(self.turn,))
+
+
+    def submit(self, function, *args):
+        # Run function in the bot's process, starting a new one if the last one died
+        try:
+            return self.executor.submit(function, *args)
+        except BrokenProcessPool:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.start_executor()
+            return self.executor.submit(function, *args)
+
 
     def create_menubar(self):
         menubar = tk.Menu(self.window)
@@ -46,6 +92,8 @@ class FourInARow:
         view_menu.add_command(label='Zoom In', accelerator='Ctrl+=', command=lambda: self.preferences.zoom(0.1))
         view_menu.add_command(label='Zoom Out', accelerator='Ctrl+-', command=lambda: self.preferences.zoom(-0.1))
         view_menu.add_command(label='Reset Zoom', accelerator='Ctrl+0', command=lambda: self.preferences.zoom(0))
+        view_menu.add_separator()
+        view_menu.add_command(label='Show Stats', accelerator='Ctrl+I', command=self.toggle_stats)
 
         menubar.add_cascade(label='File', menu=file_menu)
         menubar.add_cascade(label='View', menu=view_menu)
@@ -56,6 +104,7 @@ class FourInARow:
         self.window.bind('<Control-equal>', lambda event: self.preferences.zoom(0.1))
         self.window.bind('<Control-minus>', lambda event: self.preferences.zoom(-0.1))
         self.window.bind('<Control-0>', lambda event: self.preferences.zoom(0))
+        self.window.bind('<Control-i>', self.toggle_stats)
         self.window.protocol('WM_DELETE_WINDOW', self.menu.quit_game)
 
 
@@ -64,14 +113,22 @@ class FourInARow:
 
         # Replace player selection menu with size selection menu
         self.menu.players_menu.grid_remove()
-        self.menu.size_menu.grid(columnspan=2, row=5, sticky='ew')
+        self.menu.size_menu.grid(columnspan=2, row=6, sticky='ew')
         self.menu.prompt.config(text='What size board\nwould you like?')
 
 
-    def set_size(self, size):
-        self.board.__init__(self, size)
-        self.canvas.size = size
-        self.canvas.cells = self.canvas.draw()
+    def set_size(self, width, height=None):
+        # Forget about any move the bot is still thinking about
+        if self.thinking is not None:
+            self.thinking.cancel()
+            self.thinking = None
+
+        self.board = BitBoard(width, height)
+        self.board.listeners.append(self.on_move)
+        if self.recorder is not None:
+            self.recorder.watch(self.board, BOT_2 if self.players == 1 else 0)
+        self.instrument(self.instruments.enabled)
+        self.canvas.reset(self.board.width, self.board.height)
 
         self.menu.points[0].config(text='* P1 - 0')
         self.menu.points[1].config(text=['BOT', 'P2'][self.players > 1] + ' - 0')
@@ -83,17 +140,21 @@ class FourInARow:
 
         # Replace size selection menu with game menu
         self.menu.size_menu.grid_remove()
-        self.menu.game_menu.grid(columnspan=2, row=5, sticky='ew')
+        self.menu.game_menu.grid(columnspan=2, row=6, sticky='ew')
+        self.ponder()
 
 
-    def on_click(self, event):
-        cell_size = self.preferences.gui['cell'].get()
-        outline_size = self.preferences.gui['outline'].get()
-        spacing_size = self.preferences.gui['spacing'].get()
+    def on_move(self, col, row, connections):
+        # Update canvas
+        self.canvas.make_move(col, row, connections)
+
+        # Update point boxes
+        self.menu.points[0].config(text=f"{'* ' * (2 - self.board.player)}P1 - {self.board.points[0]}")
+        self.menu.points[1].config(text=f"{'* ' * (self.board.player - 1)}{['BOT', 'P2'][self.players > 1]} - {self.board.points[1]}")
 
-        # Find column cursor is in
-        col = max(min((self.window.winfo_pointerx() - self.window.winfo_rootx() - \
-        outline_size - spacing_size // 2) // (cell_size + spacing_size), self.board.size - 1), 0)
+
+    def on_click(self, event):
+        col = self.canvas.column_at(event.x)
 
         if not (col in self.board.get_valid_moves() and self.can_move):
             return
@@ -102,15 +163,73 @@ class FourInARow:
         self.can_move = False
         self.board.make_move(col)
 
-        # If playing against bot, queue bot's move
+        # If playing against bot, let it think in the background
+        if self.players == 1 and not self.board.is_gameover():
+            self.stop_pondering()
+            self.thinking = self.submit(find_move, self.board.width, self.board.height, [move for move, _ in self.board.history], self.ai)
+            self.window.after(16, self.check_thinking, self.thinking)
+        else:
+            self.end_turn()
+
+
+    def check_thinking(self, thinking):
+        # The game was restarted while the bot was thinking
+        if thinking is not self.thinking:
+            return
+
+        if not thinking.done():
+            self.window.after(16, self.check_thinking, thinking)
+            return
+
+        self.thinking = None
+        try:
+            move, stats = thinking.result()
+        except Exception as error:
+            # Don't leave the game stuck on the bot's turn: say what went wrong and let the greedy bot move instead
+            messagebox.showerror('Four In A Row! - Bot Error', f"The bot couldn't move ({error}), so the greedy bot has moved for it.")
+            ai = AI(self.board)
+            move, stats = ai.get_move(), ai.stats
+        self.board.make_move(move)
+        if self.instruments.enabled:
+            entry = self.instruments.record(dict(stats, width=self.board.width, height=self.board.height, ply=len(self.board.history)))
+            self.menu.stats.config(text=format_stats(entry))
+        self.end_turn()
+        self.ponder()
+
+
+    def ponder(self):
+        # Stop pondering the last turn, and if it's now the human's turn against the bot, work out
+        # the bot's replies to their likely moves in the meantime
+        self.stop_pondering()
         if self.players == 1 and not self.board.is_gameover():
-            self.board.make_move(self.ai.get_move())
+            self.submit(ponder, self.board.width, self.board.height, [move for move, _ in self.board.history], self.ai, self.turn.value)
+
+
+    def stop_pondering(self):
+        self.turn.value += 1
+
+
+    def toggle_stats(self, event=None):
+        self.menu.toggle_stats()
+        self.instrument(self.menu.showing_stats or self.instruments.file is not None)
+
+
+    def instrument(self, enabled):
+        # Time make_move and canvas rendering separately, only while stats are wanted so it costs nothing otherwise
+        self.instruments.unwrap()
+        self.instruments.enabled = enabled
+        if enabled:
+            self.instruments.wrap(self.board, 'make_move', 'make_move')
+            for name in ('animate', 'show_connections', 'redraw'):
+                self.instruments.wrap(self.canvas, name, 'render')
 
+
+    def end_turn(self):
         # Display winning message
         if self.board.is_gameover():
             self.canvas.canvas.unbind('<ButtonRelease-1>')
             self.canvas.canvas.unbind('<Motion>')
-            self.canvas.canvas.delete('highlight')
+            self.canvas.show_move()
 
             # Remove the asterisk as there's no active player
             self.menu.points[0].config(text=f'P1 - {self.board.points[0]}')
@@ -162,7 +281,7 @@ class Menu:
 
     def create(self):
         self.menu = tk.Frame(self.game.window, bg='#36454F'); self.menu.pack(fill=tk.Y, expand=True, side=tk.LEFT)
-        self.menu.rowconfigure((3, 4), weight=1)
+        self.menu.rowconfigure((3, 5), weight=1)
         
         # Titles
         tk.Label(self.menu, text='Four In', bg='#36454F', fg='#EEC643', font=('Helvetica', 36, 'bold'), padx=36
@@ -179,13 +298,18 @@ class Menu:
                     highlightbackground='#44535F', highlightthickness=4, padx=12, pady=6
         )); self.points[0].grid(column=0, row=3); self.points[1].grid(column=1, row=3)
 
+        # Stats panel, hidden until View > Show Stats
+        self.showing_stats = False
+        self.stats = tk.Label(self.menu, text=format_stats(None), bg='#536878', fg='#CFD7DE', font=('Courier New', 9),
+                              justify=tk.LEFT, highlightbackground='#44535F', highlightthickness=4, padx=12, pady=6)
+
         # Prompt box
         self.prompt = tk.Label(self.menu, text='Welcome to\nFour In A Row!', bg='#536878', fg='#CFD7DE', 
                                font=('Courier New', 12, 'bold'), highlightbackground='#44535F', highlightthickness=4, padx=12, pady=6
-        ); self.prompt.grid(columnspan=2, row=4)
+        ); self.prompt.grid(columnspan=2, row=5)
 
         # Game menu
-        self.game_menu = tk.Frame(self.menu); self.game_menu.columnconfigure((0, 1), weight=1); self.game_menu.grid(columnspan=2, row=5, sticky='ew')
+        self.game_menu = tk.Frame(self.menu); self.game_menu.columnconfigure((0, 1), weight=1); self.game_menu.grid(columnspan=2, row=6, sticky='ew')
         tk.Button(self.game_menu, text='New Game', height=3, command=self.new_game, font=('Helvetica', 12), 
                   bg='#536878', fg='#CFD7DE', activebackground='#36454F').grid(columnspan=2, row=0, sticky='ew')
         tk.Button(self.game_menu, text='Restart', height=2, width=1, command=self.restart_game, font=('Helvetica', 12),
@@ -206,6 +330,10 @@ class Menu:
         for i in range(10):
             tk.Button(self.size_menu, text=f'{i + 1}', command=lambda i=i: self.game.set_size(i + 1), height=2, width=1, 
                       font=('Helvetica', 12), bg='#536878', fg='#CFD7DE', activebackground='#36454F').grid(column=i % 5, row=i // 5, sticky='ew')
+        custom_button = tk.Button(self.size_menu, text='Custom', command=self.custom_size, height=1, font=('Helvetica', 12),
+                                  bg='#536878', fg='#CFD7DE', activebackground='#36454F')
+        custom_button.grid(columnspan=5, row=2, sticky='ew')
+        Hovertip(custom_button, f'Any number of columns and rows, up to {MAX_SIZE}x{MAX_SIZE}', hover_delay=500)
 
 
     def redraw(self):
@@ -219,6 +347,7 @@ class Menu:
 
         for item in (self.points[0], self.points[1], self.prompt):
             item.config(font=('Courier New', text_size, 'bold'), highlightthickness=outline_size, padx=text_size, pady=int(text_size * 0.5))
+        self.stats.config(font=('Courier New', int(text_size * 0.75)), highlightthickness=outline_size, padx=text_size, pady=int(text_size * 0.5))
         for button in self.game_menu.winfo_children():
             button.config(font=('Helvetica', text_size))
         for button in self.players_menu.winfo_children():
@@ -227,13 +356,33 @@ class Menu:
             button.config(font=('Helvetica', text_size))
 
 
+    def toggle_stats(self):
+        self.showing_stats = not self.showing_stats
+        if self.showing_stats:
+            self.stats.grid(columnspan=2, row=4, pady=(0, 6))
+        else:
+            self.stats.grid_remove()
+
+
+    def custom_size(self):
+        text = simpledialog.askstring('Four In A Row! - Board Size', 'How many columns x rows?\n(e.g. 7x6)', parent=self.game.window)
+        if text is None:
+            return
+
+        try:
+            self.game.set_size(*parse_size(text))
+        except ValueError:
+            messagebox.showerror('Four In A Row! - Board Size', f'Boards can be 1 to {MAX_SIZE} columns by 1 to {MAX_SIZE} rows, like 7x6.')
+
+
     def new_game(self, event=None):
         if self.game.board.is_ongoing() and not messagebox.askyesno('Four In A Row! - New Game',
         'Are you sure you would like to start a new game?'):
             return
 
+        self.game.stop_pondering()
         self.game_menu.grid_remove()
-        self.players_menu.grid(columnspan=2, row=5, sticky='ew')
+        self.players_menu.grid(columnspan=2, row=6, sticky='ew')
         self.prompt.config(text='How many players\nwould you like?')
 
 
@@ -242,7 +391,7 @@ class Menu:
         'Are you sure you would like to restart the current game?'):
             return
 
-        self.game.set_size(self.game.canvas.size)
+        self.game.set_size(self.game.canvas.width, self.game.canvas.height)
 
 
     def quit_game(self, event=None):
@@ -250,316 +399,235 @@ class Menu:
             self.game.window.destroy()
 
 
-class HiddenBoard:
-    def __init__(self, game, size):
+class VisualBoard:
+    def __init__(self, game, width, height):
         self.game = game
-        self.size = size
-
-        self.cells = [[0] * size for _ in range(size)]
-        self.entries = [0] * size
-        self.points = [0, 0]
-        self.player = 1
-
-
-    def get_valid_moves(self):
-        return [col for col in range(self.size) if self.entries[col] != self.size]
-
-
-    def make_move(self, col, check=False):
-        connections = ([], [], [], [])
-        points = 0
-
-        # Update board
-        self.cells[col][self.entries[col]] = self.player
-        self.entries[col] += 1
-
-        # Calculate points
-        row = self.entries[col] - 1
-        # Horizontal
-        for i in range(max(-3, -col), min(1, self.size - col - 3)):
-            is_connection = [self.cells[col + i + c][row] for c in range(4)] == [self.player] * 4
-            points += is_connection
-            if is_connection:
-                connections[0].append(i)
-        # Vertical
-        for i in range(max(-3, -row), min(1, self.size - row - 3)):
-            is_connection = [self.cells[col][row + i + c] for c in range(4)] == [self.player] * 4
-            points += is_connection
-            if is_connection:
-                connections[1].append(i)
-        # Positive diagonal
-        for i in range(max(-3, -col, -row), min(1, self.size - col - 3, self.size - row - 3)):
-            is_connection = [self.cells[col + i + c][row + i + c] for c in range(4)] == [self.player] * 4
-            points += is_connection
-            if is_connection:
-                connections[2].append(i)
-    	# Negative diagonal
-        for i in range(max(-3, -col, row - self.size + 1), min(1, self.size - col - 3, row - 2)):
-            is_connection = [self.cells[col + i + c][row - i - c] for c in range(4)] == [self.player] * 4
-            points += is_connection
-            if is_connection:
-                connections[3].append(i)
-
-        # Undo move and return point count
-        if check:
-            self.cells[col][self.entries[col] - 1] = 0
-            self.entries[col] -= 1
-            return points
-        
-        else:
-            # Update points and change turn
-            self.points[self.player - 1] += points
-            self.player = 3 - self.player
+        self.width = width
+        self.height = height
 
-            # Update canvas
-            self.game.canvas.make_move(col, row)
-            self.game.canvas.show_connections(col, row, connections)
+        self.canvas = tk.Canvas(self.game.window, bg='#36454F', highlightthickness=0)
+        self.canvas.pack(fill=tk.Y, side=tk.LEFT)
+        self.animations = []
+        self.falling = {}
+        self.cells = []
 
-            # Update point boxes
-            self.game.menu.points[0].config(text=f"{'* ' * (2 - self.player)}P1 - {self.points[0]}")
-            self.game.menu.points[1].config(text=f"{'* ' * (self.player - 1)}{['BOT', 'P2'][self.game.players > 1]} - {self.points[1]}")
+        # Pointer position from the last motion event, and the pending highlight update
+        self.pointer = 0
+        self.motion = None
 
+        # Zoom the canvas is currently drawn at, and how many Tk calls the last redraw made. Boards
+        # too big for the screen are shrunk by fit, and zoomed from there
+        self.scale = 1
+        self.fit = 1
+        self.redraw_calls = 0
 
-    def is_gameover(self):
-        return sum(self.entries) == self.size ** 2
+        # A board bigger than the screen is still drawn whole, the canvas just scrolls to show the rest.
+        # Wheel deltas are multiples of 120 on Windows but can be as small as 1 on macOS, so only the sign is used
+        self.canvas.bind('<MouseWheel>', lambda event: self.canvas.yview_scroll(-1 if event.delta > 0 else 1, 'units'))
+        self.canvas.bind('<Shift-MouseWheel>', lambda event: self.canvas.xview_scroll(-1 if event.delta > 0 else 1, 'units'))
+        self.canvas.bind('<Button-4>', lambda event: self.canvas.yview_scroll(-1, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.canvas.yview_scroll(1, 'units'))
+        self.draw()
 
 
-    def is_ongoing(self):
-        return sum(self.entries) > 0 and not self.is_gameover()
+    def geometry(self):
+        # Cell, spacing and outline sizes at the current zoom
+        default = self.game.preferences.gui['default']
+        return default['cell'] * self.scale, default['spacing'] * self.scale, default['outline'] * self.scale
 
 
-class VisualBoard:
-    def __init__(self, game, size):
-        self.game = game
-        self.size = size
+    def viewport(self):
+        # Largest the canvas can be while leaving room on the screen for the menu and window borders
+        return self.canvas.winfo_screenwidth() - 320, self.canvas.winfo_screenheight() - 120
 
-        self.canvas = tk.Canvas(self.game.window, bg='#36454F', highlightthickness=0)
-        self.canvas.pack(fill=tk.Y, side=tk.LEFT)
-        self.cells = self.draw()
+
+    def extent(self, cell_size, spacing_size, outline_size):
+        # Width and height of the whole board with the highlight row above it
+        return (self.width * (spacing_size + cell_size) + spacing_size + outline_size * 2,
+                (self.height + 2) * (spacing_size + cell_size) + outline_size * 2 - cell_size)
 
     
     def draw(self):
-        cell_size = self.game.preferences.gui['cell'].get()
-        spacing_size = self.game.preferences.gui['spacing'].get()
-        outline_size = self.game.preferences.gui['outline'].get()
+        default = self.game.preferences.gui['default']
+        cell_size, spacing_size, outline_size = default['cell'], default['spacing'], default['outline']
 
+        self.cancel_animations()
         self.canvas.delete('all')
 
-        # Drawing board
+        # Drawing board (at normal zoom, it's scaled to the current zoom afterwards)
         self.canvas.create_rectangle(
             outline_size // 2, outline_size // 2 + spacing_size + cell_size,
-            self.size * (spacing_size + cell_size) + spacing_size + outline_size * 1.5, 
-            (self.size + 1) * (spacing_size + cell_size) + spacing_size + outline_size * 1.5,
+            self.width * (spacing_size + cell_size) + spacing_size + outline_size * 1.5, 
+            (self.height + 1) * (spacing_size + cell_size) + spacing_size + outline_size * 1.5,
             fill='#536878', outline='#44535F', width=outline_size, tag='board')
 
         # Creating board cells
-        cells = []
-        for row in range(self.size):
-            for col in range(self.size):
-                cells.append(self.canvas.create_oval(
+        self.cells = []
+        for row in range(self.height):
+            for col in range(self.width):
+                self.cells.append(self.canvas.create_oval(
                     col * (spacing_size + cell_size) + outline_size + spacing_size,
                     (row + 1) * (spacing_size + cell_size) + outline_size + spacing_size, 
                     (col + 1) * (spacing_size + cell_size) + outline_size - 1,
                     (row + 2) * (spacing_size + cell_size) + outline_size - 1,
-                    fill='#36454F', outline='#44535F', width=outline_size // 2))
-    	
-        # Setting canvas size to fit board
-        self.canvas.config(height=min((self.size + 2) * (spacing_size + cell_size) + outline_size * 2 - cell_size, sys.float_info.max * self.size),
-                           width=min(self.size * (spacing_size + cell_size) + spacing_size + outline_size * 2, sys.float_info.max * self.size))
+                    fill='#36454F', outline='#44535F', width=outline_size // 2, tag='cell'))
 
-        return cells
+        # Move highlight, kept for the whole game and moved between columns
+        self.canvas.create_oval(0, 0, 0, 0, width=0, state='hidden', tags='highlight')
+        self.highlight = None
 
+        board_width, board_height = self.extent(cell_size, spacing_size, outline_size)
+        max_width, max_height = self.viewport()
+        self.fit = min(1, max_width / max(board_width, 1), max_height / board_height)
 
-    def redraw(self):
-        cell_size = self.game.preferences.gui['cell'].get()
-        spacing_size = self.game.preferences.gui['spacing'].get()
-        outline_size = self.game.preferences.gui['outline'].get()
+        self.scale = 1
+        self.redraw()
 
-        # Redraw board
-        self.canvas.coords(
-            'board', outline_size // 2, outline_size // 2 + spacing_size + cell_size,
-            self.size * (spacing_size + cell_size) + spacing_size + outline_size * 1.5, 
-            (self.size + 1) * (spacing_size + cell_size) + spacing_size + outline_size * 1.5)
-        self.canvas.itemconfig('board', width=outline_size)
-
-        # Redraw cells and connection outlines
-        for row in range(1, self.size + 1):
-            for col in range(self.size):
-                self.canvas.coords(
-                    self.cells[(row - 1) * self.size + col], 
-                    col * (spacing_size + cell_size) + outline_size + spacing_size,
-                    row * (spacing_size + cell_size) + outline_size + spacing_size, 
-                    (col + 1) * (spacing_size + cell_size) + outline_size - 1,
-                    (row + 1) * (spacing_size + cell_size) + outline_size - 1)
-                self.canvas.itemconfig(self.cells[(row - 1) * self.size + col], width=outline_size // 2)
-        self.canvas.itemconfig('connected', width=outline_size)
 
-        # Changing canvas size to fit board
-        self.canvas.config(height=min((self.size + 2) * (spacing_size + cell_size) + outline_size * 2 - cell_size, sys.float_info.max),
-                           width=min(self.size * (spacing_size + cell_size) + spacing_size + outline_size * 2, sys.float_info.max))
+    def reset(self, width, height):
+        if (width, height) != (self.width, self.height) or len(self.cells) != width * height:
+            self.width, self.height = width, height
+            self.draw()
+            return
 
-        # Redraw move highlight
+        # Same size, so just empty the cells rather than recreating them
+        self.cancel_animations()
+        self.canvas.itemconfig('cell', fill='#36454F', outline='#44535F', width=int(self.geometry()[2]) // 2)
+        self.canvas.dtag('connected', 'connected')
         self.show_move()
 
 
-    def show_move(self, event=None):
-        self.canvas.delete('highlight')
+    def cancel_animations(self):
+        # If player restarts game, cancel animations
+        for animation in self.animations:
+            self.canvas.after_cancel(animation)
+        self.animations = []
+        self.falling = {}
 
-        if self.game.players == 0 or self.game.board.player > self.game.players:
-            return
 
-        cell_size = self.game.preferences.gui['cell'].get()
-        spacing_size = self.game.preferences.gui['spacing'].get()
-        outline_size = self.game.preferences.gui['outline'].get()
+    def call(self, method, *args, **kwargs):
+        # Canvas calls made through here are counted in redraw_calls
+        self.redraw_calls += 1
+        return getattr(self.canvas, method)(*args, **kwargs)
 
-        # Find board column cursor is in
-        col = max(min((self.game.window.winfo_pointerx() - self.game.window.winfo_rootx() - \
-        outline_size - spacing_size // 2) // (cell_size + spacing_size), self.size - 1), 0)
-
-        # Drawing highlight counter
-        self.canvas.create_oval(
-            col * (spacing_size + cell_size) + outline_size + spacing_size, spacing_size // 2, 
-            (col + 1) * (spacing_size + cell_size) + outline_size - 1, spacing_size // 2 + cell_size - 1,
-            fill=('#BFA546', '#BF512D')[self.game.board.player - 1], tags='highlight', width=0)
 
+    def redraw(self):
+        self.redraw_calls = 0
+
+        # Everything on the canvas is drawn in proportion to the zoom, so one scale call
+        # moves and resizes all of it however big the board is
+        ratio = self.game.preferences.scale * self.fit / self.scale
+        self.scale = self.game.preferences.scale * self.fit
+        self.call('scale', 'all', 0, 0, ratio, ratio)
+        outline_size = int(self.geometry()[2])
+
+        # Line widths don't scale, so set them by tag
+        self.call('itemconfig', 'board', width=outline_size)
+        self.call('itemconfig', 'cell', width=outline_size // 2)
+        self.call('itemconfig', 'connected', width=outline_size)
+
+        # Changing canvas size to fit board, or the screen if the board is bigger, scrolling the rest
+        board_width, board_height = self.extent(*self.geometry())
+        max_width, max_height = self.viewport()
+        self.call('config', height=min(board_height, sys.float_info.max * self.height, max_height),
+                  width=min(board_width, sys.float_info.max * self.width, max_width), scrollregion=(0, 0, board_width, board_height))
 
-    def make_move(self, col, row):
+        # Redraw move highlight
         self.show_move()
 
-        # If player quits game mid animation, don't throw error
-        try:
-            colour = ('#EEC643', '#EE5622')[2 - self.game.board.player]
-            for cell in range(self.size - row):
-                if cell > 0:
-                    self.canvas.itemconfig(self.cells[(cell - 1) * self.size + col], fill='#36454F')
-
-                # If player restarts game, cancel animation
-                if self.game.can_move:
-                    return
-
-                self.canvas.itemconfig(self.cells[cell * self.size + col], fill=colour)
-                time.sleep(0.06)
-                self.canvas.update()
-        except:
-            return
 
+    def column_at(self, x):
+        # Board column an x position in the window is in, allowing for how far the canvas is scrolled
+        x = self.canvas.canvasx(x)
+        cell_size, spacing_size, outline_size = self.geometry()
+        return int(max(min((x - outline_size - spacing_size // 2) // (cell_size + spacing_size), self.width - 1), 0))
 
-    def show_connections(self, col, row, connections):
-        colour = ('#B29432', '#B24019')[2 - self.game.board.player]
-        outline_size = self.game.preferences.gui['outline'].get()
 
-        # Horizontal
-        for counter in connections[0]:
-            for i in range(counter, counter + 4):
-                self.canvas.itemconfig(self.cells[(self.size - row - 1) * self.size + col + i], width=outline_size, outline=colour, tag='connected')
+    def show_move(self, event=None):
+        # Pointer motion only records where the pointer is, the highlight is updated at most once a frame
+        if event is not None:
+            self.pointer = event.x
+            if self.motion is None:
+                self.motion = self.canvas.after(16, self.update_highlight)
+            return
 
-        # Vertical
-        for counter in connections[1]:
-            for i in range(counter, counter + 4):
-                self.canvas.itemconfig(self.cells[(self.size - row - 1 - i) * self.size + col], width=outline_size, outline=colour, tag='connected')
+        self.update_highlight()
 
-        # Positive diagonal
-        for counter in connections[2]:
-            for i in range(counter, counter + 4):
-                self.canvas.itemconfig(self.cells[(self.size - row - 1 - i) * self.size + col + i], width=outline_size, outline=colour, tag='connected')
 
-        # Negative diagonal
-        for counter in connections[3]:
-            for i in range(counter, counter + 4):
-                self.canvas.itemconfig(self.cells[(self.size - row - 1 + i) * self.size + col + i], width=outline_size, outline=colour, tag='connected')
+    def update_highlight(self):
+        self.motion = None
 
+        # Column and colour the highlight counter should have, or None if it should be hidden
+        player = self.game.board.player
+        if self.game.players == 0 or player > self.game.players or self.game.board.is_gameover():
+            highlight = None
+        else:
+            highlight = (self.column_at(self.pointer), player)
 
-class AI:
-    def __init__(self, game):
-        self.game = game
+        # Only touch the canvas when the highlight actually changes
+        if highlight == self.highlight:
+            return
+        self.highlight = highlight
 
-    
-    def get_move(self):
-        ordered_cols = ()
-        points = ()
-
-        # Organise columns into centered order
-        for i in range(self.game.board.size - 1, -1, -1):
-            if i % 2 == 0:
-                ordered_cols += (self.game.board.size - 1 - i // 2,)
-            else:
-                ordered_cols += (i // 2,)
+        if highlight is None:
+            self.call('itemconfig', 'highlight', state='hidden')
+            return
 
-        # Remove ordered columns that aren't valid moves, but retain order
-        moves = [col for col in ordered_cols if col in self.game.board.get_valid_moves()]
+        col = highlight[0]
+        cell_size, spacing_size, outline_size = self.geometry()
+        self.call('coords', 'highlight',
+            col * (spacing_size + cell_size) + outline_size + spacing_size, spacing_size // 2, 
+            (col + 1) * (spacing_size + cell_size) + outline_size - 1, spacing_size // 2 + cell_size - 1)
+        self.call('itemconfig', 'highlight', fill=('#BFA546', '#BF512D')[player - 1], state='normal')
 
-        # Check for points each move would generate
-        for move in moves:
-            points += (self.game.board.make_move(move, True),)
 
-        # If there are no points for the AI, try block the player
-        if max(points) < 1:
-            points = ()
-            self.game.board.player = 1
-            for move in moves:
-                points += (self.game.board.make_move(move, True),)
-            self.game.board.player = 2
+    def make_move(self, col, row, connections):
+        self.show_move()
+        self.animate(col, row, connections, 3 - self.game.board.player, object(), 0, None)
+
+
+    def animate(self, col, row, connections, player, counter, cell, previous):
+        # Drop the counter one cell every 60ms (a few at a time on tall boards so it doesn't take
+        # seconds), leaving the Tk loop free in between. The cell it was last in is only cleared
+        # if another counter hasn't fallen into it since
+        if previous is not None and self.falling.get(self.cells[previous * self.width + col]) is counter:
+            self.canvas.itemconfig(self.cells[previous * self.width + col], fill='#36454F')
+        self.canvas.itemconfig(self.cells[cell * self.width + col], fill=('#EEC643', '#EE5622')[player - 1])
+        self.falling[self.cells[cell * self.width + col]] = counter
+
+        bottom = self.height - row - 1
+        if cell < bottom:
+            self.animations.append(self.canvas.after(60, self.animate, col, row, connections, player, counter,
+                                                     min(cell + max(self.height // 8, 1), bottom), cell))
+        else:
+            self.show_connections(col, row, connections, player)
 
-        return moves[points.index(max(points))]
 
+    def show_connections(self, col, row, connections, player):
+        colour = ('#B29432', '#B24019')[player - 1]
+        outline_size = int(self.geometry()[2])
 
-game = FourInARow()
+        # Outline the cells of every window that was connected
+        index = self.game.board.index
+        for direction, offsets in enumerate(connections):
+            for offset in offsets:
+                for item in index.items[index.window_at(direction, col, row, offset)]:
+                    self.canvas.itemconfig(self.cells[item], width=outline_size, outline=colour, tags=('cell', 'connected'))
 
 
-"""
-class AlphaBetaAI:
-    def __init__(self, game):
-        self.game = game
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play Four In A Row.')
+    parser.add_argument('--workers', type=int, default=1, help='number of processes the bot searches with')
+    parser.add_argument('--record', help='file to append finished games to, see records.py')
+    parser.add_argument('--stats', help='file to append bot and rendering stats to as JSON lines, see stats.py')
+    parser.add_argument('--ai', help="bot to play against instead of the alpha-beta one, e.g. 'mcts:time_limit=500'")
+    args = parser.parse_args()
 
-    def get_best_move(self, depth, alpha, beta):
-        if depth == 0:
-            return evaluation
-        
-        moves = self.generate_moves()
-
-        # If end of the game is reached
-        if len(moves) == 0:
-            return evaluation
-
-        for move in moves:
-            self.game.board.make_move(move)
-            evaluation = -self.get_best_move(depth - 1, -beta, -alpha)
-            self.game.board.unmake_move(move)
-            if evaluation >= beta:
-                return beta
-            alpha = max(alpha, evaluation)
-
-        return alpha
-
-
-    # Board function for AlphaBeta AI to work on
-
-    def evaluation(self):
-        evaluation = 0
-
-        # Horizontals
-        for i in range(self.size - 3):
-            for j in range(self.size):
-                evaluation += [self.cells[i + c][j] for c in range(4)] == [1] * 4
-                evaluation -= [self.cells[i + c][j] for c in range(4)] == [2] * 4
-
-        # Verticals
-        for i in range(self.size):
-            for j in range(self.size - 3):
-                evaluation += [self.cells[i][j + c] for c in range(4)] == [1] * 4
-                evaluation -= [self.cells[i][j + c] for c in range(4)] == [2] * 4            
-
-        # Positive diagonals
-        for i in range(self.size - 3):
-            for j in range(self.size - 3):
-                evaluation += [self.cells[i + c][j + c] for c in range(4)] == [1] * 4
-                evaluation -= [self.cells[i + c][j + c] for c in range(4)] == [2] * 4            
-
-        # Negative diagonals
-        for i in range(self.size - 3):
-            for j in range(3, self.size):
-                evaluation += [self.cells[i + c][j - c] for c in range(4)] == [1] * 4
-                evaluation -= [self.cells[i + c][j - c] for c in range(4)] == [2] * 4
-
-        return evaluation
-"""
\ No newline at end of file
+    # Check the bot spec here, as a bad one would otherwise only fail in the bot's process mid game
+    if args.ai is not None:
+        try:
+            create_ai(None, args.ai)
+        except (ValueError, TypeError) as error:
+            parser.error(f'invalid --ai {args.ai!r}: {error}')
+
+    game = FourInARow(args.workers, args.record, args.stats, args.ai)
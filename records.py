@@ -0,0 +1,182 @@
+"""
+Compact binary game records, for auditing the bot and building training data.
+
+Each record is a 4 byte header (board width, player modes, number of moves) followed by the moves
+packed two to a byte, 4 bits each. Rectangular boards have a TALL flag in the modes and their height
+in one more byte after the header, and boards wider than 16 have a WIDE flag and a byte per move.
+Records are only ever appended. A side index file holds the 8 byte offset of every record so game N
+can be read straight from a memory map.
+
+Usage: python records.py games.rec            (summary of every game)
+       python records.py games.rec --game 12  (replay one game)
+"""
+
+
+import argparse, mmap, os, struct
+from collections import namedtuple
+
+from engine import BitBoard
+
+
+HEADER = struct.Struct('<BBH')
+OFFSET = struct.Struct('<Q')
+
+# Bits of the modes byte, set when that player is the bot
+BOT_1, BOT_2 = 1, 2
+
+# Bits of the modes byte describing the board: a height byte follows the header, and moves take a whole byte
+TALL, WIDE = 4, 8
+
+Record = namedtuple('Record', 'width height modes moves')
+
+
+def pack_moves(moves, wide=False):
+    if wide:
+        return bytes(moves)
+
+    # Two moves per byte, the first in the low 4 bits
+    packed = bytearray((len(moves) + 1) // 2)
+    for i, move in enumerate(moves):
+        packed[i // 2] |= move << 4 * (i % 2)
+    return bytes(packed)
+
+
+def unpack_moves(data, count, wide=False):
+    if wide:
+        return list(data[:count])
+    return [data[i // 2] >> 4 * (i % 2) & 15 for i in range(count)]
+
+
+def moves_length(count, modes):
+    return count if modes & WIDE else (count + 1) // 2
+
+
+def parse_record(data, offset):
+    width, modes, count = HEADER.unpack_from(data, offset)
+    start = offset + HEADER.size
+    height = width
+    if modes & TALL:
+        height = data[start]
+        start += 1
+    return Record(width, height, modes & (BOT_1 | BOT_2), unpack_moves(data[start:start + moves_length(count, modes)], count, modes & WIDE))
+
+
+class RecordWriter:
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+        self.index = open(path + '.idx', 'ab')
+
+
+    def write(self, width, height, modes, moves):
+        if not 0 < width < 256 or not 0 < height < 256:
+            raise ValueError(f'Board sizes are stored in a byte, so {width}x{height} boards can\'t be recorded')
+
+        # Square boards up to 16 wide take the original compact form
+        modes |= (TALL if height != width else 0) | (WIDE if width > 16 else 0)
+        header = HEADER.pack(width, modes, len(moves)) + (bytes((height,)) if modes & TALL else b'')
+
+        self.file.seek(0, 2)
+        self.index.write(OFFSET.pack(self.file.tell()))
+        self.file.write(header + pack_moves(moves, modes & WIDE))
+
+        # Flush every game, so a crash only loses the game in progress
+        self.file.flush()
+        self.index.flush()
+
+
+    def watch(self, board, modes):
+        # Write the board's game out as soon as it finishes
+        def on_move(col, row, connections):
+            if board.is_gameover():
+                self.write(board.width, board.height, modes, [move for move, _ in board.history])
+
+        board.listeners.append(on_move)
+
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+
+def read_records(path):
+    # Stream records one at a time, so files of any length can be read
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+
+            width, modes, count = HEADER.unpack(header)
+            height = file.read(1)[0] if modes & TALL else width
+            yield Record(width, height, modes & (BOT_1 | BOT_2), unpack_moves(file.read(moves_length(count, modes)), count, modes & WIDE))
+
+
+class RecordIndex:
+    def __init__(self, path):
+        self.records = self.map(path)
+        self.offsets = self.map(path + '.idx')
+
+
+    def map(self, path):
+        # Empty files can't be memory mapped
+        if os.path.getsize(path) == 0:
+            return b''
+        with open(path, 'rb') as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+    def __len__(self):
+        return len(self.offsets) // OFFSET.size
+
+
+    def __getitem__(self, n):
+        if not 0 <= n < len(self):
+            raise IndexError(f'Game {n} is not in the index ({len(self)} games)')
+        return parse_record(self.records, OFFSET.unpack_from(self.offsets, n * OFFSET.size)[0])
+
+
+    def close(self):
+        for data in (self.records, self.offsets):
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay(record):
+    board = BitBoard(record.width, record.height)
+    for move in record.moves:
+        board.make_move(move)
+    return board
+
+
+def describe(number, record):
+    board = replay(record)
+    players = ' vs '.join(('human', 'bot')[bool(record.modes & bit)] for bit in (BOT_1, BOT_2))
+    return f'game {number}: {record.width}x{record.height}, {players}, {len(record.moves)} moves, points {board.points[0]}-{board.points[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read Four In A Row game records.')
+    parser.add_argument('path', help='record file')
+    parser.add_argument('--game', type=int, help='only show this game, read through the index')
+    args = parser.parse_args()
+
+    if args.game is not None:
+        with RecordIndex(args.path) as index:
+            record = index[args.game]
+        print(describe(args.game, record))
+        print('moves:', ' '.join(map(str, record.moves)))
+    else:
+        for number, record in enumerate(read_records(args.path)):
+            print(describe(number, record))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Plays the bot against itself without a display, for testing the engine on headless machines.
+A few random opening moves are played before the bots take over so that games differ.
+
+Usage: python selfplay.py --games 1000 --size 7
+"""
+
+
+import argparse, random, time
+
+from engine import BitBoard, AI, AlphaBetaAI, parse_size
+from records import RecordWriter, BOT_1, BOT_2
+from stats import Instrumentation
+
+
+def play_game(width, height, openings, rng, time_limit=None, recorder=None, instruments=None):
+    board = BitBoard(width, height)
+    bot = AI(board) if time_limit is None else AlphaBetaAI(board, time_limit)
+    if recorder is not None:
+        recorder.watch(board, BOT_1 | BOT_2)
+    if instruments is not None:
+        instruments.wrap(board, 'make_move', 'make_move')
+
+    while not board.is_gameover():
+        if sum(board.entries) < openings:
+            board.make_move(rng.choice(board.get_valid_moves()))
+        else:
+            board.make_move(bot.get_move())
+            if instruments is not None:
+                instruments.record(dict(bot.stats, width=width, height=height, ply=len(board.history)))
+
+    if instruments is not None:
+        instruments.unwrap()
+    return board.points
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play bot-vs-bot games of Four In A Row without a display.')
+    parser.add_argument('--games', type=int, default=1000, help='number of games to play')
+    parser.add_argument('--size', type=parse_size, default='7', help="board size, like 7 or 7x6 for 7 columns of 6 rows, up to 50x50")
+    parser.add_argument('--openings', type=int, default=2, help='number of random moves at the start of each game')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random opening moves')
+    parser.add_argument('--time', type=int, default=None, help='use the alpha-beta bot with this many milliseconds per move')
+    parser.add_argument('--record', help='file to append the games to, see records.py')
+    parser.add_argument('--stats', help='file to append the stats of every bot move to as JSON lines, see stats.py')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    recorder = RecordWriter(args.record) if args.record else None
+    instruments = Instrumentation(args.stats) if args.stats else None
+    wins = [0, 0]
+    draws = 0
+    points = [0, 0]
+
+    start = time.perf_counter()
+    for _ in range(args.games):
+        game_points = play_game(*args.size, args.openings, rng, args.time, recorder, instruments)
+        if game_points[0] == game_points[1]:
+            draws += 1
+        else:
+            wins[game_points[0] < game_points[1]] += 1
+        points[0] += game_points[0]
+        points[1] += game_points[1]
+    elapsed = time.perf_counter() - start
+
+    if recorder is not None:
+        recorder.close()
+    if instruments is not None:
+        instruments.close()
+
+    games = max(args.games, 1)
+    print(f'{args.games} games on a {args.size[0]}x{args.size[1]} board in {elapsed:.2f}s ({args.games / max(elapsed, 1e-9):.1f} games/s)')
+    print(f'P1 wins: {wins[0]}  P2 wins: {wins[1]}  Draws: {draws}')
+    print(f'Average points: P1 {points[0] / games:.2f}  P2 {points[1] / games:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Hosts many independent games of Four In A Row from one process, for bots and headless clients, rather
+than one Tk window per game. Clients connect over TCP or a Unix socket and send one JSON object per line,
+getting one JSON object back per line:
+
+    {"op": "new", "width": 7, "height": 6, "players": 1, "ai": "alphabeta:time_limit=200", "time_limit": 500}
+    {"op": "move", "game": 1, "col": 3}    a human move (against the bot, it replies straight away)
+    {"op": "move", "game": 1}              the bot moves for whoever's turn it is
+    {"op": "state", "game": 1}
+    {"op": "close", "game": 1}
+    {"op": "stats"}
+
+players is the number of humans: 0 for bot vs bot, 1 against the bot or 2. Bot moves run in a process pool
+so the event loop never blocks. Bots stop searching at their game's time limit, and one that still hasn't
+moved a grace period after that (say every process is busy) is replaced for that move by the greedy bot.
+Games nobody has touched for a while are closed.
+
+Usage: python server.py --port 4444 --workers 4
+       python server.py --unix /tmp/four-in-a-row.sock
+"""
+
+
+import argparse, asyncio, inspect, json, os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import BitBoard, AI, AIS, MAX_SIZE, create_ai, find_move
+from tournament import percentile
+
+
+# Longest request line the server reads, in bytes
+LINE_LIMIT = 2 ** 16
+
+# Bot options a client can set. The rest, like depth, solve_below and table_size, can make a bot
+# search for far longer than the time limit or fill a worker's memory, so are left at their defaults
+CLIENT_OPTIONS = ('time_limit', 'playouts', 'exploration')
+
+
+class Session:
+    def __init__(self, number, width, height, players, ai, time_limit):
+        self.number = number
+        self.board = BitBoard(width, height)
+        self.players = players
+        self.ai = ai
+        self.time_limit = time_limit
+
+        # Set while a move is being made, and when the game was last touched
+        self.busy = False
+        self.active = time.monotonic()
+
+
+    def state(self):
+        board = self.board
+        return {'game': self.number, 'width': board.width, 'height': board.height, 'players': self.players,
+                'player': board.player, 'points': board.points, 'moves': [move for move, _ in board.history],
+                'valid': board.get_valid_moves(), 'gameover': board.is_gameover()}
+
+
+class GameServer:
+    def __init__(self, workers, move_time, grace_time, idle_time):
+        self.executor = ProcessPoolExecutor(workers)
+        self.sessions = {}
+        self.started = 0
+
+        # Longest a bot may search for, how much longer its move may take before the greedy bot
+        # plays instead, and how long a game may sit untouched, in seconds
+        self.move_time = move_time
+        self.grace_time = grace_time
+        self.idle_time = idle_time
+
+        # Throughput, and how long the last few thousand bot moves took
+        self.start = time.monotonic()
+        self.moves = 0
+        self.timeouts = 0
+        self.latencies = deque(maxlen=4096)
+
+
+    async def handle(self, reader, writer):
+        # One connection can play any number of games, a request at a time
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Too long to read, and where the next request starts can't be found, so give up on the connection
+                    writer.write(json.dumps({'ok': False, 'error': f'Requests must be under {LINE_LIMIT} bytes'}).encode() + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Requests must be JSON objects')
+                    response = dict(await self.dispatch(request), ok=True)
+                except (ValueError, TypeError) as error:
+                    response = {'ok': False, 'error': str(error)}
+                except Exception as error:
+                    # Anything else (like a bot's process dying) still gets an answer, so the client isn't left waiting
+                    response = {'ok': False, 'error': f'{type(error).__name__}: {error}'}
+
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+    async def dispatch(self, request):
+        op = request.get('op')
+        if op == 'new':
+            return self.new_game(request)
+        elif op == 'stats':
+            return self.stats()
+
+        session = self.sessions.get(request.get('game'))
+        if session is None:
+            raise ValueError(f"There is no game {request.get('game')!r}")
+        session.active = time.monotonic()
+
+        if op == 'state':
+            return session.state()
+        elif op == 'move':
+            return await self.move(session, request.get('col'))
+        elif op == 'close':
+            del self.sessions[session.number]
+            return {'game': session.number, 'closed': True}
+        raise ValueError(f'Unknown op {op!r}, expected new, move, state, close or stats')
+
+
+    def new_game(self, request):
+        width, height = request.get('width', 7), request.get('height', request.get('width', 7))
+        players, ai = request.get('players', 1), request.get('ai', 'alphabeta:time_limit=200')
+        time_limit = request.get('time_limit', self.move_time * 1000)
+
+        # JSON true and false are ints to Python, so are ruled out first
+        if not all(isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= MAX_SIZE for value in (width, height)):
+            raise ValueError(f'Boards can be 1 to {MAX_SIZE} cells each way')
+        if isinstance(players, bool) or players not in (0, 1, 2):
+            raise ValueError('players is the number of humans, 0, 1 or 2')
+        if isinstance(time_limit, bool) or not isinstance(time_limit, (int, float)) or not time_limit >= 1:
+            raise ValueError('time_limit is the milliseconds the bot gets for each move, at least 1')
+        time_limit = min(time_limit, self.move_time * 1000)
+
+        # The server already runs bots in parallel, so each one gets a single process
+        name, _, options = ai.partition(':') if isinstance(ai, str) else (None, None, None)
+        if name not in AIS or name == 'parallel':
+            raise ValueError(f"Unknown AI {ai!r}, expected one of {', '.join(name for name in AIS if name != 'parallel')}")
+
+        # Bots that search for a while are told to stop at the game's time limit, so a slow one doesn't keep
+        # a process busy after it's been given up on
+        options = dict(option.partition('=')[::2] for option in filter(None, options.split(',')))
+        allowed = [key for key in CLIENT_OPTIONS if key in inspect.signature(AIS[name]).parameters]
+        for key in options:
+            if key not in allowed:
+                raise ValueError(f"The {name} bot can't be given {key}" + (f", only {', '.join(allowed)}" if allowed else ''))
+        if 'time_limit' in allowed:
+            options['time_limit'] = min(int(options.get('time_limit', time_limit)), int(time_limit))
+            if options['time_limit'] < 1:
+                raise ValueError('time_limit is the milliseconds the bot gets for each move, at least 1')
+        ai = name + (':' + ','.join(f'{key}={value}' for key, value in options.items()) if options else '')
+        create_ai(None, ai)
+
+        self.started += 1
+        session = self.sessions[self.started] = Session(self.started, width, height, players, ai, time_limit)
+        return session.state()
+
+
+    async def move(self, session, col):
+        board = session.board
+        if session.busy:
+            raise ValueError(f'Game {session.number} is already making a move')
+        if board.is_gameover():
+            raise ValueError(f'Game {session.number} is over')
+        if col is not None and (session.players == 0 or session.players == 1 and board.player == 2):
+            raise ValueError("It's the bot's turn")
+        if col is None and session.players == 2:
+            raise ValueError('There is no bot in a 2 player game')
+        if col is not None and col not in board.get_valid_moves():
+            raise ValueError(f'Column {col!r} is not a valid move')
+
+        session.busy = True
+        try:
+            played = []
+            if col is not None:
+                board.make_move(col)
+                played.append(col)
+
+            # The bot moves when it's asked to, and straight after the human against the bot
+            if (col is None or session.players == 1) and not board.is_gameover():
+                played.append(await self.bot_move(session))
+        finally:
+            session.busy = False
+
+        self.moves += len(played)
+        return dict(session.state(), played=played)
+
+
+    async def bot_move(self, session):
+        board = session.board
+        history = [move for move, _ in board.history]
+        loop = asyncio.get_running_loop()
+
+        start = time.perf_counter()
+        try:
+            move, _ = await asyncio.wait_for(loop.run_in_executor(self.executor, find_move, board.width, board.height, history, session.ai),
+                                             session.time_limit / 1000 + self.grace_time)
+        except asyncio.TimeoutError:
+            # Too slow, so play the greedy bot's move instead, which is quick enough to work out here
+            self.timeouts += 1
+            move = AI(board, book=False, solve_below=0).get_move()
+        self.latencies.append((time.perf_counter() - start) * 1000)
+
+        board.make_move(move)
+        return move
+
+
+    def stats(self):
+        uptime = time.monotonic() - self.start
+        latencies = list(self.latencies)
+        return {'games': len(self.sessions), 'started': self.started, 'moves': self.moves, 'moves_per_second': self.moves / max(uptime, 1e-9),
+                'timeouts': self.timeouts, 'bot_p50_ms': percentile(latencies, 50), 'bot_p95_ms': percentile(latencies, 95), 'uptime': uptime}
+
+
+    async def close_idle(self):
+        # Close games nobody has touched for idle_time seconds
+        while True:
+            await asyncio.sleep(min(self.idle_time, 10))
+            now = time.monotonic()
+            for number, session in list(self.sessions.items()):
+                if now - session.active > self.idle_time and not session.busy:
+                    del self.sessions[number]
+
+
+    async def report(self, interval):
+        moves = self.moves
+        while True:
+            await asyncio.sleep(interval)
+            print(f'{len(self.sessions)} games in progress, {(self.moves - moves) / interval:.1f} moves/s', flush=True)
+            moves = self.moves
+
+
+async def serve(args):
+    game_server = GameServer(args.workers, args.move_time, args.grace, args.idle)
+    if args.unix:
+        server = await asyncio.start_unix_server(game_server.handle, path=args.unix, limit=LINE_LIMIT)
+        print(f'Serving on {args.unix}', flush=True)
+    else:
+        server = await asyncio.start_server(game_server.handle, args.host, args.port, limit=LINE_LIMIT)
+        print(f'Serving on {args.host}:{args.port}', flush=True)
+
+    tasks = [asyncio.create_task(game_server.close_idle())]
+    if args.report:
+        tasks.append(asyncio.create_task(game_server.report(args.report)))
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        game_server.executor.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host many Four In A Row games over a socket.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=4444, help='TCP port to listen on')
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes bots think in')
+    parser.add_argument('--move-time', type=float, default=2, help='most seconds a bot can search for in any game')
+    parser.add_argument('--grace', type=float, default=1, help='seconds past its time limit a bot move can take before the greedy bot plays instead')
+    parser.add_argument('--idle', type=float, default=600, help='seconds a game can go untouched before it is closed')
+    parser.add_argument('--report', type=float, default=10, help='seconds between progress reports, 0 for none')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Solves small boards completely: the best move and final point difference of every position that
+can come up in a game. Each size's table is saved to data/solved_<size>.bin (see engine.PositionTable),
+and the AI plays from it instead of searching.
+
+Usage: python solve.py --sizes 1-4
+"""
+
+
+import argparse, os, time
+
+from engine import BitBoard, PositionTable, DATA_DIRECTORY, table_path, centre_moves, parse_sizes
+
+
+def solve_all(board, entries):
+    # Final point difference for the player to move, recording the best move of every unfinished position
+    if board.hash in entries:
+        return entries[board.hash][2]
+    if board.is_gameover():
+        return board.points[board.player - 1] - board.points[2 - board.player]
+
+    # Centre columns first, so ties go to the centre
+    best, best_move = -float('inf'), None
+    for move in centre_moves(board):
+        board.make_move(move)
+        value = -solve_all(board, entries)
+        board.unmake_move()
+        if value > best:
+            best, best_move = value, move
+
+    entries[board.hash] = (board.hash, best_move, best)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build solved tables for small boards.')
+    parser.add_argument('--sizes', default='1-4', help='board sizes, as a range like 1-4 or a list like 3,4')
+    args = parser.parse_args()
+
+    try:
+        sizes = parse_sizes(args.sizes)
+    except ValueError as error:
+        parser.error(str(error))
+
+    os.makedirs(DATA_DIRECTORY, exist_ok=True)
+    for size in sizes:
+        start = time.perf_counter()
+        entries = {}
+        value = solve_all(BitBoard(size), entries)
+
+        path = table_path('solved', size, size)
+        PositionTable.save(path, entries.values())
+        print(f'{size}x{size}: {len(entries)} positions, first player finishes {value:+} in {time.perf_counter() - start:.1f}s -> {path}')
+
+
+if __name__ == '__main__':
+    main()
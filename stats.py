@@ -0,0 +1,98 @@
+"""
+Instrumentation for the bot and the GUI. Every AI move reports the nodes it searched, nodes per second,
+depth reached, transposition table hits, misses and collisions, effective branching factor, how often the
+first move tried caused a cutoff and time taken (see AI.get_move), and make_move and canvas rendering are
+timed separately.
+Entries can be appended to a file as JSON lines for offline analysis.
+
+Nothing is timed until methods are wrapped, and the wrappers are removed again when it's turned off,
+so a disabled Instrumentation costs nothing.
+"""
+
+
+import json, time
+
+
+class Instrumentation:
+    def __init__(self, path=None):
+        self.file = open(path, 'a') if path else None
+        self.enabled = False
+
+        # Calls and exclusive seconds of every timed method, by label
+        self.timings = {}
+        self.wrapped = []
+
+        # Time spent in timed methods called from the one running, so nested calls aren't counted twice
+        self.stack = []
+        self.last = None
+
+
+    def wrap(self, target, name, label):
+        # Time target.name under label, by shadowing the method with an instance attribute
+        method = getattr(target, name)
+        timing = self.timings.setdefault(label, [0, 0])
+
+        def timed(*args, **kwargs):
+            self.stack.append(0)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                timing[0] += 1
+                timing[1] += elapsed - self.stack.pop()
+                if self.stack:
+                    self.stack[-1] += elapsed
+
+        setattr(target, name, timed)
+        self.wrapped.append((target, name))
+
+
+    def unwrap(self):
+        for target, name in self.wrapped:
+            if name in vars(target):
+                delattr(target, name)
+        self.wrapped = []
+
+
+    def summary(self):
+        return {label: {'calls': calls, 'total_ms': total * 1000, 'mean_ms': total * 1000 / calls if calls else 0}
+                for label, (calls, total) in self.timings.items()}
+
+
+    def record(self, entry):
+        # Keep the latest entry for display and write it out with the timings so far
+        self.last = dict(entry, timings=self.summary())
+        if self.file is not None:
+            self.file.write(json.dumps(self.last) + '\n')
+            self.file.flush()
+        return self.last
+
+
+    def close(self):
+        self.unwrap()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def format_stats(entry):
+    # A few short lines for the stats panel
+    if entry is None:
+        return 'No bot moves yet'
+
+    lines = [f"{entry['source']}: col {entry['move'] + 1} in {entry['time_ms']:.0f}ms"]
+    if 'playouts' in entry:
+        lines.append(f"{entry['playouts']} playouts, {entry['playouts_per_second'] / 1000:.1f}k/s")
+    elif entry['nodes']:
+        lines.append(f"{entry['nodes']} nodes, {entry['nps'] / 1000:.1f}k/s")
+    if entry['depth']:
+        lines.append(f"depth {entry['depth']}" + (f", bf {entry['branching']:.1f}" if entry['branching'] else ''))
+    if entry['hit_rate'] is not None:
+        lines.append(f"TT hits {entry['hit_rate']:.0%}, {entry['misses']} misses")
+        lines.append(f"TT collisions {entry['collisions']}")
+    if entry.get('first_cutoff_rate') is not None:
+        lines.append(f"1st move cuts {entry['first_cutoff_rate']:.0%}")
+    for label, timing in entry['timings'].items():
+        lines.append(f"{label} {timing['mean_ms']:.2f}ms")
+    return '\n'.join(lines)
@@ -0,0 +1,94 @@
+"""
+Round trips of the binary game records: games of several sizes are written, read back both by
+streaming the file and through the memory mapped index, and replayed to the same points. The sizes
+cover the compact packing (with odd move counts), the TALL height byte and the WIDE move bytes.
+"""
+
+
+import random
+
+import pytest
+
+from engine import BitBoard
+from records import RecordWriter, RecordIndex, read_records, replay, BOT_1, BOT_2
+
+
+SIZES = [(7, 6), (6, 7), (5, 5), (16, 16), (17, 17), (50, 50), (1, 1)]
+
+
+def random_game(width, height, rng, finish=True):
+    # A fixed-seed random game, stopped part way through unless finish is set
+    board = BitBoard(width, height)
+    length = width * height if finish else rng.randrange(width * height)
+    for _ in range(length):
+        board.make_move(rng.choice(board.get_valid_moves()))
+    return board
+
+
+@pytest.fixture
+def games(tmp_path):
+    # Finished and unfinished games of every size, written with every player mode
+    rng = random.Random(0)
+    path = str(tmp_path / 'games.rec')
+    games = []
+    writer = RecordWriter(path)
+    for width, height in SIZES:
+        for finish in (True, False, False):
+            board = random_game(width, height, rng, finish)
+            modes = (0, BOT_1, BOT_2, BOT_1 | BOT_2)[len(games) % 4]
+            moves = [move for move, _ in board.history]
+            writer.write(width, height, modes, moves)
+            games.append((width, height, modes, moves, board.points))
+    writer.close()
+    return path, games
+
+
+def test_read_records(games):
+    path, expected = games
+    records = list(read_records(path))
+    assert len(records) == len(expected)
+    for record, (width, height, modes, moves, points) in zip(records, expected):
+        assert (record.width, record.height, record.modes, record.moves) == (width, height, modes, moves)
+        assert replay(record).points == points
+
+
+def test_record_index(games):
+    path, expected = games
+    with RecordIndex(path) as index:
+        assert len(index) == len(expected)
+
+        # Backwards, so every record is found by its offset rather than by reading on from the last
+        for n in reversed(range(len(expected))):
+            width, height, modes, moves, points = expected[n]
+            record = index[n]
+            assert (record.width, record.height, record.modes, record.moves) == (width, height, modes, moves)
+            assert replay(record).points == points
+
+        with pytest.raises(IndexError):
+            index[len(expected)]
+
+
+def test_odd_move_counts(tmp_path):
+    # The last byte of an odd number of packed moves only has its low 4 bits used
+    path = str(tmp_path / 'odd.rec')
+    writer = RecordWriter(path)
+    for count in range(8):
+        writer.write(16, 16, 0, [15 - i for i in range(count)])
+    writer.close()
+    assert [record.moves for record in read_records(path)] == [[15 - i for i in range(count)] for count in range(8)]
+
+
+def test_watch_writes_finished_games(tmp_path):
+    path = str(tmp_path / 'watched.rec')
+    writer = RecordWriter(path)
+    board = BitBoard(4, 5)
+    writer.watch(board, BOT_2)
+    rng = random.Random(1)
+    while not board.is_gameover():
+        board.make_move(rng.choice(board.get_valid_moves()))
+    writer.close()
+
+    records = list(read_records(path))
+    assert len(records) == 1
+    assert records[0].moves == [move for move, _ in board.history] and records[0].modes == BOT_2
+    assert replay(records[0]).points == board.points
@@ -0,0 +1,110 @@
+"""
+Checks that the faster boards, and the NumPy batch scoring in batch.py, still score exactly like the
+original board, which rescanned the windows of four through every move. Games are random but seeded, on
+every square size from 1 to 10 and a few rectangular boards.
+"""
+
+
+import random
+
+import pytest
+
+from engine import HiddenBoard, BitBoard
+
+
+SIZES = [(size, size) for size in range(1, 11)] + [(7, 6), (1, 8), (8, 1), (4, 9), (12, 5)]
+
+
+def scan(cells, width, height, col, row, player):
+    # The original scoring: compare every window of four through the cell with the player's counters
+    connections = ([], [], [], [])
+    for i in range(max(-3, -col), min(1, width - col - 3)):
+        if [cells[col + i + c][row] for c in range(4)] == [player] * 4:
+            connections[0].append(i)
+    for i in range(max(-3, -row), min(1, height - row - 3)):
+        if [cells[col][row + i + c] for c in range(4)] == [player] * 4:
+            connections[1].append(i)
+    for i in range(max(-3, -col, -row), min(1, width - col - 3, height - row - 3)):
+        if [cells[col + i + c][row + i + c] for c in range(4)] == [player] * 4:
+            connections[2].append(i)
+    for i in range(max(-3, -col, row - height + 1), min(1, width - col - 3, row - 2)):
+        if [cells[col + i + c][row - i - c] for c in range(4)] == [player] * 4:
+            connections[3].append(i)
+    return sum(map(len, connections)), connections
+
+
+def random_games(width, height, games=20):
+    # Columns of fixed-seed random games, played until the board is full
+    rng = random.Random(f'{width}x{height}')
+    for _ in range(games):
+        board = HiddenBoard(width, height)
+        moves = []
+        while not board.is_gameover():
+            moves.append(rng.choice(board.get_valid_moves()))
+            board.make_move(moves[-1])
+        yield moves
+
+
+@pytest.mark.parametrize('board_type', [HiddenBoard, BitBoard])
+@pytest.mark.parametrize('width, height', SIZES)
+def test_scores_match_scan(board_type, width, height):
+    for moves in random_games(width, height):
+        board = board_type(width, height)
+        seen = []
+        board.listeners.append(lambda col, row, connections: seen.append(connections))
+        cells = [[0] * height for _ in range(width)]
+        points = [0, 0]
+
+        for col in moves:
+            row, player = board.entries[col], board.player
+            cells[col][row] = player
+            expected, connections = scan(cells, width, height, col, row, player)
+            points[player - 1] += expected
+
+            # Checking the move gives the points without changing the board, then playing it tells the canvas the same windows
+            assert board.make_move(col, True) == expected
+            assert board.entries[col] == row
+            board.make_move(col)
+            assert seen[-1] == connections
+            assert board.points == points
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_incremental_threats_match_rescan(width, height):
+    # HiddenBoard keeps window counts as moves are made and taken back, BitBoard rescans them when evaluated
+    for moves in random_games(width, height, 3):
+        board, bit_board = HiddenBoard(width, height), BitBoard(width, height)
+        for col in moves + [None] * len(moves):
+            if col is None:
+                board.unmake_move()
+                bit_board.unmake_move()
+            else:
+                board.make_move(col)
+                bit_board.make_move(col)
+            assert board.threats == board.count_threats()
+            assert bit_board.evaluation() == board.evaluation()
+        assert bit_board.bits == [0, 0] and board.hash == bit_board.hash == 0
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_batch_matches_board(width, height):
+    pytest.importorskip('numpy')
+    import batch
+
+    # Every position of a few games, stacked into one batch
+    boards = []
+    for moves in random_games(width, height, 5):
+        board = BitBoard(width, height)
+        for col in moves:
+            boards.append(board.copy())
+            board.make_move(col)
+        boards.append(board)
+    cells = batch.stack(boards)
+
+    scores = batch.score_moves(cells)
+    evaluations = batch.evaluate(cells)
+    connections = batch.connection_counts(cells)
+    for i, board in enumerate(boards):
+        assert scores[i].tolist() == [board.make_move(col, True) if col in board.get_valid_moves() else -1 for col in range(width)]
+        assert evaluations[i] == board.evaluation()
+        assert connections[i].tolist() == board.points
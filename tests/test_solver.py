@@ -0,0 +1,61 @@
+"""
+Checks the endgame solver and the shipped solved tables against a plain minimax over every move
+order, on fixed-seed random positions with only a few empty cells left.
+"""
+
+
+import random
+
+import pytest
+
+from engine import BitBoard, Solver, get_position_table
+
+
+def minimax(board):
+    # Final point difference for the player to move, trying every move with no pruning or memory
+    if board.is_gameover():
+        return board.points[board.player - 1] - board.points[2 - board.player]
+
+    best = -float('inf')
+    for col in board.get_valid_moves():
+        board.make_move(col)
+        best = max(best, -minimax(board))
+        board.unmake_move()
+    return best
+
+
+def endgames(width, height, empty, count):
+    # Positions from fixed-seed random games with empty cells left
+    rng = random.Random(f'{width}x{height}-{empty}')
+    for _ in range(count):
+        board = BitBoard(width, height)
+        while width * height - len(board.history) > empty:
+            board.make_move(rng.choice(board.get_valid_moves()))
+        yield board
+
+
+def value_after(board, move):
+    board.make_move(move)
+    value = -minimax(board)
+    board.unmake_move()
+    return value
+
+
+@pytest.mark.parametrize('width, height', [(4, 4), (5, 5), (7, 6), (6, 7), (10, 10)])
+def test_solver_matches_minimax(width, height):
+    solver = Solver()
+    for empty in range(1, 8):
+        for board in endgames(width, height, empty, 3):
+            move, value = solver.solve(board.copy())
+            assert value == minimax(board)
+            assert value_after(board, move) == value
+
+
+def test_solved_table_matches_minimax():
+    table = get_position_table('solved', 4, 4)
+    assert table is not None
+    for empty in range(1, 9):
+        for board in endgames(4, 4, empty, 5):
+            move, value = table.lookup(board.hash)
+            assert value == minimax(board)
+            assert value_after(board, move) == value
@@ -0,0 +1,165 @@
+"""
+Plays AI variants against each other on a range of board sizes, using every core, and reports
+win/draw/loss rates, point margins and move latencies. Results are saved as JSON so two runs
+can be compared, which fails (exit code 1) if the win rates shift or moves get slower.
+
+Usage: python tournament.py greedy alphabeta:time_limit=50 --games 10 --output results.json
+       python tournament.py greedy alphabeta:time_limit=50 --compare results.json
+"""
+
+
+import argparse, itertools, json, os, random, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import BitBoard, create_ai, parse_sizes
+
+
+def play_game(size, first, second, openings, seed):
+    board = BitBoard(size)
+    bots = (create_ai(board, first), create_ai(board, second))
+    latencies = ([], [])
+    rng = random.Random(seed)
+
+    while not board.is_gameover():
+        # A few random moves first so repeated games differ
+        if sum(board.entries) < openings:
+            board.make_move(rng.choice(board.get_valid_moves()))
+            continue
+
+        bot = board.player - 1
+        start = time.perf_counter()
+        move = bots[bot].get_move()
+        latencies[bot].append((time.perf_counter() - start) * 1000)
+        board.make_move(move)
+
+    return board.points, latencies
+
+
+def percentile(values, percent):
+    # Nearest rank percentile
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[max(int(len(values) * percent / 100 + 0.5) - 1, 0)]
+
+
+def run(variants, sizes, games, openings, workers, seed):
+    # Every pair of variants plays the given number of games on each size, swapping first player each game
+    pairings, tasks = [], []
+    for a, b in itertools.combinations(variants, 2):
+        for size in sizes:
+            for game in range(games):
+                first, second = (a, b) if game % 2 == 0 else (b, a)
+                pairings.append((a, b, size, first, second))
+                tasks.append((size, first, second, openings, seed + len(tasks)))
+
+    with ProcessPoolExecutor(workers) as pool:
+        outcomes = list(pool.map(play_game, *zip(*tasks), chunksize=4))
+
+    matches = {}
+    latencies = {variant: [] for variant in variants}
+    for (a, b, size, first, second), (points, game_latencies) in zip(pairings, outcomes):
+        match = matches.setdefault((a, b, size), {'a': a, 'b': b, 'size': size, 'wins': 0, 'draws': 0, 'losses': 0, 'margin': 0})
+
+        # Points and latencies from a's point of view
+        a_index = 0 if first == a else 1
+        margin = points[a_index] - points[1 - a_index]
+        match['wins'] += margin > 0
+        match['draws'] += margin == 0
+        match['losses'] += margin < 0
+        match['margin'] += margin
+        latencies[first] += game_latencies[0]
+        latencies[second] += game_latencies[1]
+
+    for match in matches.values():
+        played = match['wins'] + match['draws'] + match['losses']
+        match['win_rate'] = match['wins'] / played
+        match['draw_rate'] = match['draws'] / played
+        match['loss_rate'] = match['losses'] / played
+        match['mean_margin'] = match.pop('margin') / played
+
+    return {
+        'variants': variants, 'sizes': sizes, 'games': games, 'openings': openings, 'seed': seed,
+        'matches': list(matches.values()),
+        'latency': {variant: {'moves': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                              'max': max(values, default=0)} for variant, values in latencies.items()}
+    }
+
+
+def report(results):
+    print(f"{'A':>24} {'B':>24} {'size':>4} {'win':>6} {'draw':>6} {'loss':>6} {'margin':>7}")
+    for match in results['matches']:
+        print(f"{match['a']:>24} {match['b']:>24} {match['size']:>4} {match['win_rate']:>6.1%} "
+              f"{match['draw_rate']:>6.1%} {match['loss_rate']:>6.1%} {match['mean_margin']:>7.2f}")
+
+    print(f"\n{'variant':>24} {'moves':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for variant, latency in results['latency'].items():
+        print(f"{variant:>24} {latency['moves']:>7} {latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['max']:>8.2f}")
+
+
+def compare(results, baseline, tolerance):
+    # List everything that is worse than the baseline by more than the tolerance
+    regressions = []
+
+    baseline_matches = {(match['a'], match['b'], match['size']): match for match in baseline['matches']}
+    for match in results['matches']:
+        old = baseline_matches.get((match['a'], match['b'], match['size']))
+        if old is not None and abs(match['win_rate'] - old['win_rate']) > tolerance / 100:
+            regressions.append(f"{match['a']} vs {match['b']} on size {match['size']}: "
+                               f"win rate changed {old['win_rate']:.1%} -> {match['win_rate']:.1%}")
+
+    for variant, latency in results['latency'].items():
+        old = baseline['latency'].get(variant)
+        if old is not None and latency['p95'] > old['p95'] * (1 + tolerance / 100):
+            regressions.append(f"{variant}: p95 latency {old['p95']:.2f}ms -> {latency['p95']:.2f}ms")
+
+    return regressions
+
+
+def add_baseline_arguments(parser):
+    # Options for saving results and checking them against an earlier run's, see save_and_compare
+    parser.add_argument('--output', help='file to save the results to as JSON')
+    parser.add_argument('--compare', help='results file from an earlier run to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=10, help='percentage change allowed before it counts as a regression')
+
+
+def save_and_compare(results, args, compare):
+    # Save the results if asked to, and exit with code 1 if compare finds regressions from the baseline
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play AI variants against each other and report how they do.')
+    parser.add_argument('variants', nargs='+', help="AI specs, e.g. greedy or 'alphabeta:time_limit=100'")
+    parser.add_argument('--sizes', default='4-10', help='board sizes, as a range like 4-10 or a list like 5,7')
+    parser.add_argument('--games', type=int, default=10, help='games per pair of variants per size')
+    parser.add_argument('--openings', type=int, default=2, help='number of random moves at the start of each game')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes to play games in')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random opening moves')
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    if len(args.variants) < 2:
+        parser.error('at least two variants are needed')
+    try:
+        sizes = parse_sizes(args.sizes)
+    except ValueError as error:
+        parser.error(str(error))
+
+    results = run(args.variants, sizes, args.games, args.openings, args.workers, args.seed)
+    report(results)
+    save_and_compare(results, args, compare)
+
+
+if __name__ == '__main__':
+    main()